@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, documents, users
+from app.api.v1.endpoints import auth, documents, users, models, progress
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(documents.router, prefix="/documents", tags=["documents"])
+api_router.include_router(models.router, prefix="/models", tags=["models"])
+api_router.include_router(progress.router, prefix="/progress", tags=["progress"])
@@ -1,27 +1,46 @@
 import os
 import uuid
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session, selectinload
 from app.core.database import get_db
 from app.core.auth import get_current_user
+from app.core.cache import response_cache
 from app.core.config import settings
+from app.core.rate_limit import rate_limited
 from app.models.document import Document
 from app.models.analysis import Analysis
 from app.models.user import User
-from app.schemas.document import DocumentResponse, DocumentCreate
-from app.schemas.analysis import AnalysisResponse
+from app.schemas.document import DocumentResponse, DocumentCreate, SearchResult, DocumentChunk
+from app.schemas.analysis import AnalysisResponse, ClauseFlag, ClauseSummary
+from app.schemas.job import JobStatus
+from app.services.export import iter_export_rows, ndjson_lines, csv_lines
+from app.services.maintenance import MaintenanceRunner, delete_document_files
+from app.services.extractors import sniff_format, MIME_TYPES, UnsupportedFormatError, EmptyDocumentError
+from app.services.progress import progress_broker, ProgressCallback
+from app.services.text_store import (
+    extract_chunks, load_clause_flags, load_document_chunk, load_page_report, save_clause_flags
+)
 from app.services.rag_service import RAGService
-import PyPDF2
-from docx import Document as DocxDocument
+from app.services.scheduler import analysis_scheduler
+from app.services.speculative import SpeculativeAnalyzer
 
 router = APIRouter()
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 rag_service = RAGService()
+speculative_analyzer = SpeculativeAnalyzer(rag_service)
+maintenance = MaintenanceRunner(rag_service)
+document_list_adapter = TypeAdapter(List[DocumentResponse])
+analysis_list_adapter = TypeAdapter(List[AnalysisResponse])
 
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
     file: UploadFile = File(...),
-    current_user = Depends(get_current_user),
+    current_user = Depends(rate_limited("upload")),
     db: Session = Depends(get_db)
 ):
     """Upload a new document"""
@@ -50,11 +69,21 @@ async def upload_document(
     unique_filename = f"{uuid.uuid4()}.{file_extension}"
     file_path = os.path.join(settings.UPLOAD_DIR, unique_filename)
     
-    # Save file
+    # Save file in chunks so large uploads never sit in memory whole
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
     with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            buffer.write(chunk)
+    
+    # Trust the file's contents, not the client-supplied content type
+    try:
+        mime_type = MIME_TYPES[sniff_format(file_path)]
+    except UnsupportedFormatError as e:
+        os.remove(file_path)
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e)
+        )
     
     # Get user
     user = db.query(User).filter(User.email == current_user.email).first()
@@ -66,7 +95,7 @@ async def upload_document(
         original_filename=file.filename,
         file_path=file_path,
         file_size=file.size,
-        mime_type=file.content_type or "application/octet-stream",
+        mime_type=mime_type,
         status="uploaded"
     )
     
@@ -74,26 +103,116 @@ async def upload_document(
     db.commit()
     db.refresh(db_document)
     
+    if settings.SPECULATIVE_ANALYSIS:
+        speculative_analyzer.schedule(
+            user.id, db_document.id, db_document.file_path, db_document.file_size
+        )
+    
     return db_document
 
 @router.get("/", response_model=List[DocumentResponse])
 async def get_documents(
+    request: Request,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all documents for current user"""
+    cached = response_cache.lookup(request, current_user.email)
+    if cached:
+        return cached
+    
+    user = db.query(User).filter(User.email == current_user.email).first()
+    version = response_cache.version(user.id)
+    documents = db.query(Document).options(
+        selectinload(Document.analyses)
+    ).filter(Document.user_id == user.id).all()
+    body = document_list_adapter.dump_json(
+        document_list_adapter.validate_python(documents, from_attributes=True)
+    )
+    return response_cache.store(request, current_user.email, user.id, version, body)
+
+@router.get("/search", response_model=List[SearchResult])
+async def search_documents(
+    q: str,
+    current_user = Depends(rate_limited("search")),
+    db: Session = Depends(get_db)
+):
+    """Search the current user's analyzed documents"""
+    user = db.query(User).filter(User.email == current_user.email).first()
+    document_ids = [str(row.id) for row in db.query(Document.id).filter(Document.user_id == user.id)]
+    if not document_ids:
+        return []
+    return await run_in_threadpool(rag_service.query_documents, q, document_ids)
+
+@router.get("/export")
+async def export_documents(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user = Depends(rate_limited("export")),
+    db: Session = Depends(get_db)
+):
+    """Stream all documents with their analyses as NDJSON or CSV"""
     user = db.query(User).filter(User.email == current_user.email).first()
-    documents = db.query(Document).filter(Document.user_id == user.id).all()
-    return documents
+    query = db.query(Document, Analysis).outerjoin(
+        Analysis, Analysis.document_id == Document.id
+    ).filter(Document.user_id == user.id)
+    if status_filter:
+        query = query.filter(Document.status == status_filter)
+    if since:
+        query = query.filter(Document.created_at >= since)
+    if until:
+        query = query.filter(Document.created_at < until)
+    query = query.order_by(Document.id, Analysis.id)
+    
+    rows = iter_export_rows(query)
+    if format == "csv":
+        body, media_type = csv_lines(rows), "text/csv"
+    else:
+        body, media_type = ndjson_lines(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="documents.{format}"'}
+    )
+
+@router.get("/clauses", response_model=ClauseSummary)
+async def get_clause_summary(
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Count known risky clauses across the current user's indexed documents"""
+    user = db.query(User).filter(User.email == current_user.email).first()
+    documents = db.query(Document.id, Document.file_path).filter(Document.user_id == user.id).all()
+    # Flags found by other workers or before a restart are persisted next to each upload
+    missing = await run_in_threadpool(_restore_clause_flags, documents)
+    if missing:
+        # Documents analyzed before flags were persisted still have them in their latest analysis
+        latest = {}
+        for document_id, analysis_data in db.query(Analysis.document_id, Analysis.analysis_data).filter(
+            Analysis.document_id.in_(missing)
+        ).order_by(Analysis.created_at, Analysis.id):
+            latest[document_id] = (analysis_data or {}).get("clauses")
+        for document_id, flags in latest.items():
+            if flags is not None:
+                rag_service.clause_index.set_flags(str(document_id), flags)
+    return rag_service.clause_index.summary([str(document_id) for document_id, _ in documents])
 
 @router.get("/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
+    request: Request,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get specific document by ID"""
+    cached = response_cache.lookup(request, current_user.email)
+    if cached:
+        return cached
+    
     user = db.query(User).filter(User.email == current_user.email).first()
+    version = response_cache.version(user.id)
     document = db.query(Document).filter(
         Document.id == document_id,
         Document.user_id == user.id
@@ -105,12 +224,13 @@ async def get_document(
             detail="Document not found"
         )
     
-    return document
+    body = DocumentResponse.model_validate(document).model_dump_json().encode()
+    return response_cache.store(request, current_user.email, user.id, version, body)
 
 @router.post("/{document_id}/analyze", response_model=AnalysisResponse)
 async def analyze_document(
     document_id: int,
-    current_user = Depends(get_current_user),
+    current_user = Depends(rate_limited("analyze")),
     db: Session = Depends(get_db)
 ):
     """Analyze document using RAG"""
@@ -126,29 +246,41 @@ async def analyze_document(
             detail="Document not found"
         )
     
-    # Extract text from document
-    text = ""
+    document.status = "processing"
+    db.commit()
+    progress = progress_broker.reporter(user.id, document_id)
+    
     try:
-        if document.mime_type == "application/pdf":
-            with open(document.file_path, "rb") as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
-        elif document.mime_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
-            doc = DocxDocument(document.file_path)
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-        else:
-            with open(document.file_path, "r", encoding="utf-8") as file:
-                text = file.read()
-    except Exception as e:
+        # Reuse anything speculative analysis already produced for this upload
+        speculation = await speculative_analyzer.take(document_id)
+        chunks = speculation.get("chunks")
+        rag_result = speculation.get("rag_result")
+        
+        if rag_result is None:
+            # Wait for a fair share of the analysis workers; larger files cost more
+            cost = 1 + document.file_size / (1024 * 1024)
+            async with analysis_scheduler.slot(user.id, document_id, cost=cost):
+                if chunks is None:
+                    chunks = await _read_chunks(document, progress)
+                
+                # Process with RAG
+                rag_result = await run_in_threadpool(
+                    rag_service.process_document, "\n".join(chunks), str(document_id), chunks, progress
+                )
+    except Exception:
+        document.status = "error"
+        db.commit()
+        raise
+    text = "\n".join(chunks)
+    
+    # The document may have been deleted while it was being analyzed
+    if db.query(Document.id).filter(Document.id == document_id).first() is None:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error reading document: {str(e)}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
         )
     
-    # Process with RAG
-    rag_result = rag_service.process_document(text, str(document_id))
+    await run_in_threadpool(save_clause_flags, document.file_path, rag_result["clause_flags"])
     
     # Create analysis record
     analysis = Analysis(
@@ -156,6 +288,12 @@ async def analyze_document(
         analysis_type="summary",
         original_text=text[:1000],  # Store first 1000 chars
         simplified_text=rag_result["analysis"],
+        analysis_data={
+            "prompt": rag_result["prompt_stats"],
+            "model_calls": rag_result["model_calls"],
+            "clauses": rag_result["clause_flags"],
+            "pages": load_page_report(document.file_path)
+        },
         confidence_score=rag_result["confidence_score"],
         processing_time=rag_result["processing_time"]
     )
@@ -170,14 +308,50 @@ async def analyze_document(
     
     return analysis
 
+@router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_document(
+    document_id: int,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Delete a document with its analyses, files and index data"""
+    user = db.query(User).filter(User.email == current_user.email).first()
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    speculative_analyzer.discard(document_id)
+    file_path = document.file_path
+    db.query(Analysis).filter(Analysis.document_id == document_id).delete(synchronize_session=False)
+    db.delete(document)
+    db.commit()
+    
+    # Files go only once the rows are gone; anything left behind is collected as an orphan
+    await run_in_threadpool(delete_document_files, file_path)
+    rag_service.remove_document(str(document_id))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 @router.get("/{document_id}/analysis", response_model=List[AnalysisResponse])
 async def get_document_analyses(
     document_id: int,
+    request: Request,
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all analyses for a document"""
+    cached = response_cache.lookup(request, current_user.email)
+    if cached:
+        return cached
+    
     user = db.query(User).filter(User.email == current_user.email).first()
+    version = response_cache.version(user.id)
     document = db.query(Document).filter(
         Document.id == document_id,
         Document.user_id == user.id
@@ -190,4 +364,128 @@ async def get_document_analyses(
         )
     
     analyses = db.query(Analysis).filter(Analysis.document_id == document_id).all()
-    return analyses
+    body = analysis_list_adapter.dump_json(
+        analysis_list_adapter.validate_python(analyses, from_attributes=True)
+    )
+    return response_cache.store(request, current_user.email, user.id, version, body)
+
+@router.get("/{document_id}/clauses", response_model=List[ClauseFlag])
+async def get_document_clauses(
+    document_id: int,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Flag known risky clauses in a document without calling the model"""
+    user = db.query(User).filter(User.email == current_user.email).first()
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    if not await run_in_threadpool(_restore_clause_flags, [(document.id, document.file_path)]):
+        return rag_service.clause_index.get_flags(str(document_id))
+    
+    chunks = await _read_chunks(document)
+    await run_in_threadpool(rag_service.index_document, "\n".join(chunks), str(document_id), chunks)
+    flags = rag_service.clause_index.get_flags(str(document_id))
+    await run_in_threadpool(save_clause_flags, document.file_path, flags)
+    return flags
+
+@router.get("/{document_id}/chunks/{index}", response_model=DocumentChunk)
+async def get_document_chunk(
+    document_id: int,
+    index: int,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get one chunk of a document's extracted text"""
+    user = db.query(User).filter(User.email == current_user.email).first()
+    document = db.query(Document).filter(
+        Document.id == document_id,
+        Document.user_id == user.id
+    ).first()
+    
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Document not found"
+        )
+    
+    stored = await run_in_threadpool(load_document_chunk, document.file_path, index)
+    if stored is not None:
+        count, text = stored
+    else:
+        # Missing, stale or damaged store: extract again, which also rewrites it
+        chunks = await _read_chunks(document)
+        count = len(chunks)
+        text = chunks[index] if 0 <= index < count else None
+    if text is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chunk not found"
+        )
+    return DocumentChunk(index=index, count=count, text=text)
+
+@router.get("/{document_id}/job", response_model=JobStatus)
+async def get_analysis_job(
+    document_id: int,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get the status and queue position of the latest analysis job for a document"""
+    user = db.query(User).filter(User.email == current_user.email).first()
+    job = analysis_scheduler.get_job(user.id, document_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No analysis job for this document"
+        )
+    
+    return JobStatus(
+        id=job.id,
+        document_id=job.document_id,
+        state=job.state,
+        queue_position=analysis_scheduler.queue_position(job),
+        enqueued_at=job.enqueued_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+def _restore_clause_flags(documents) -> List[int]:
+    """Load persisted clause flags for (id, file_path) pairs this worker lacks; returns ids still unknown"""
+    missing = []
+    for document_id, file_path in documents:
+        if rag_service.clause_index.get_flags(str(document_id)) is not None:
+            continue
+        flags = load_clause_flags(file_path)
+        if flags is None:
+            missing.append(document_id)
+        else:
+            rag_service.clause_index.set_flags(str(document_id), flags)
+    return missing
+
+async def _read_chunks(document: Document, progress: Optional[ProgressCallback] = None) -> List[str]:
+    """Extracted text chunks of a document, from its text store when available"""
+    try:
+        return await run_in_threadpool(extract_chunks, document.file_path, progress)
+    except UnsupportedFormatError as e:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=str(e)
+        )
+    except EmptyDocumentError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error reading document: {str(e)}"
+        )
@@ -0,0 +1,17 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends
+from app.core.auth import get_current_user
+from app.services.model_router import model_router
+from app.api.v1.endpoints.documents import rag_service
+
+router = APIRouter()
+
+@router.get("/routing")
+async def get_model_routing(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Get the model registry with observed latencies and recent routing decisions"""
+    return model_router.stats()
+
+@router.get("/embeddings")
+async def get_embedding_stats(current_user = Depends(get_current_user)) -> Dict[str, Any]:
+    """Get embedding throughput, batching and cache hit rate"""
+    return rag_service.embeddings.stats()
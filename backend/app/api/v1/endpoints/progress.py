@@ -0,0 +1,45 @@
+import asyncio
+from fastapi import APIRouter, WebSocket, status
+from app.core.auth import verify_token
+from app.core.database import SessionLocal
+from app.models.user import User
+from app.services.progress import progress_broker
+
+router = APIRouter()
+
+@router.websocket("/ws")
+async def progress_channel(websocket: WebSocket, token: str):
+    """Push the current user's document status changes and processing progress.
+
+    Browsers cannot set headers on WebSocket requests, so the access token is
+    passed as the ``token`` query parameter.
+    """
+    token_data = verify_token(token)
+    user = None
+    if token_data is not None:
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.email == token_data.email).first()
+        finally:
+            db.close()
+    if user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    
+    await websocket.accept()
+    async with progress_broker.subscribe(user.id) as queue:
+        receive = asyncio.create_task(websocket.receive())
+        try:
+            while True:
+                next_event = asyncio.create_task(queue.get())
+                done, _ = await asyncio.wait({receive, next_event}, return_when=asyncio.FIRST_COMPLETED)
+                if receive in done:
+                    next_event.cancel()
+                    if receive.result()["type"] == "websocket.disconnect":
+                        break
+                    # Clients have nothing to say; ignore keep-alive messages
+                    receive = asyncio.create_task(websocket.receive())
+                    continue
+                await websocket.send_json(next_event.result())
+        finally:
+            receive.cancel()
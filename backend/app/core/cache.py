@@ -0,0 +1,149 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy import event, select
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.analysis import Analysis
+from app.models.document import Document
+
+
+class InMemoryVersionStore:
+    """Per-user data versions for a single worker process"""
+
+    def __init__(self):
+        # Versions restart on boot, so tag them with a boot id to keep old ETags from matching
+        self._boot = uuid.uuid4().hex[:8]
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int) -> str:
+        return f"{self._boot}.{self._versions.get(user_id, 0)}"
+
+    def bump(self, user_id: int):
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+
+class RedisVersionStore:
+    """Per-user data versions shared by every API worker"""
+
+    def __init__(self, url: str):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+
+    def get(self, user_id: int) -> str:
+        # The counter restarts when redis loses the key, so pair it with a random tag that
+        # is created along with it; both live in one hash and are evicted together
+        key = f"cache-version:{user_id}"
+        pipe = self.redis.pipeline()
+        pipe.hsetnx(key, "tag", uuid.uuid4().hex[:8])
+        pipe.hmget(key, "tag", "count")
+        tag, count = pipe.execute()[1]
+        return f"{tag.decode()}.{int(count or 0)}"
+
+    def bump(self, user_id: int):
+        self.redis.hincrby(f"cache-version:{user_id}", "count", 1)
+
+
+class ResponseCache:
+    """Caches serialized read responses per user until that user's documents or analyses change.
+
+    Entries are keyed by user and URL and tagged with the user's version; any
+    committed write to the user's ``Document``/``Analysis`` rows bumps the version
+    and so invalidates every entry at once. Cached responses carry a strong ETag,
+    so a matching ``If-None-Match`` gets a 304 without any database work.
+    """
+
+    def __init__(self, versions, max_entries: int):
+        self.versions = versions
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, str], Tuple[str, str, bytes]]" = OrderedDict()
+        # Emails never change, so the email -> id mapping can be remembered
+        self._user_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(request: Request) -> str:
+        return str(request.url.path) + ("?" + request.url.query if request.url.query else "")
+
+    @staticmethod
+    def _respond(request: Request, etag: str, body: bytes) -> Response:
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def lookup(self, request: Request, email: str) -> Optional[Response]:
+        """A 304 or cached response for the request, or None if it must be computed"""
+        user_id = self._user_ids.get(email)
+        if user_id is None:
+            return None
+        key = (user_id, self._key(request))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None or entry[0] != self.versions.get(user_id):
+            return None
+        return self._respond(request, entry[1], entry[2])
+
+    def store(self, request: Request, email: str, user_id: int, version: str, body: bytes) -> Response:
+        """Cache a freshly computed body under the version read before computing it"""
+        self._user_ids[email] = user_id
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        with self._lock:
+            self._entries[(user_id, self._key(request))] = (version, etag, body)
+            self._entries.move_to_end((user_id, self._key(request)))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return self._respond(request, etag, body)
+
+    def version(self, user_id: int) -> str:
+        """Read before querying, so a write racing the query leaves the entry stale, not wrong"""
+        return self.versions.get(user_id)
+
+    def invalidate(self, user_id: int):
+        self.versions.bump(user_id)
+
+
+def create_response_cache() -> ResponseCache:
+    if settings.RESPONSE_CACHE_STORE == "redis":
+        versions = RedisVersionStore(settings.REDIS_URL)
+    else:
+        versions = InMemoryVersionStore()
+    return ResponseCache(versions, settings.RESPONSE_CACHE_SIZE)
+
+
+response_cache = create_response_cache()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changed_users(session, flush_context):
+    """Remember which users' documents or analyses this transaction touched"""
+    changed = session.info.setdefault("cache_changed_users", set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Document):
+            changed.add(obj.user_id)
+        elif isinstance(obj, Analysis):
+            if "document" in obj.__dict__ and obj.document is not None:
+                changed.add(obj.document.user_id)
+            else:
+                changed.add(session.connection().scalar(
+                    select(Document.user_id).where(Document.id == obj.document_id)
+                ))
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("cache_changed_users", set()):
+        if user_id is not None:
+            response_cache.invalidate(user_id)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("cache_changed_users", None)
@@ -0,0 +1,125 @@
+import asyncio
+import time
+from typing import Dict, Tuple
+from fastapi import Depends, HTTPException, status
+from app.core.auth import get_current_user
+from app.core.config import settings
+
+RATE_WINDOW_SECONDS = 60
+# Concurrency slots expire in case a worker dies while holding them
+SLOT_TTL_SECONDS = 600
+
+
+class InMemoryLimitStore:
+    """Process-local counters; used for tests and single-worker deployments"""
+
+    def __init__(self):
+        self._windows: Dict[str, Tuple[int, float]] = {}
+        self._slots: Dict[str, int] = {}
+        self._lock = asyncio.Lock()
+
+    async def hit(self, key: str, window: int) -> int:
+        """Count a request in the current fixed window and return the total so far"""
+        now = time.time()
+        async with self._lock:
+            count, expires = self._windows.get(key, (0, 0.0))
+            if expires <= now:
+                count, expires = 0, now + window
+            count += 1
+            self._windows[key] = (count, expires)
+            if len(self._windows) > 10000:
+                self._windows = {k: v for k, v in self._windows.items() if v[1] > now}
+            return count
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        async with self._lock:
+            if self._slots.get(key, 0) >= limit:
+                return False
+            self._slots[key] = self._slots.get(key, 0) + 1
+            return True
+
+    async def release(self, key: str):
+        async with self._lock:
+            remaining = self._slots.get(key, 0) - 1
+            if remaining > 0:
+                self._slots[key] = remaining
+            else:
+                self._slots.pop(key, None)
+
+
+class RedisLimitStore:
+    """Counters shared by every API worker through redis"""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self.redis = redis.from_url(url)
+
+    async def hit(self, key: str, window: int) -> int:
+        bucket = f"ratelimit:{key}:{int(time.time() // window)}"
+        pipe = self.redis.pipeline()
+        pipe.incr(bucket)
+        pipe.expire(bucket, window)
+        count, _ = await pipe.execute()
+        return count
+
+    async def acquire(self, key: str, limit: int) -> bool:
+        slot = f"slots:{key}"
+        count = await self.redis.incr(slot)
+        await self.redis.expire(slot, SLOT_TTL_SECONDS)
+        if count > limit:
+            await self.redis.decr(slot)
+            return False
+        return True
+
+    async def release(self, key: str):
+        await self.redis.decr(f"slots:{key}")
+
+
+def create_limit_store():
+    if settings.RATE_LIMIT_STORE == "redis":
+        return RedisLimitStore(settings.REDIS_URL)
+    return InMemoryLimitStore()
+
+
+limit_store = create_limit_store()
+
+
+def _too_many(detail: str, retry_after: int):
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)},
+    )
+
+
+def rate_limited(action: str):
+    """Dependency enforcing per-user and global rate and concurrency limits for an action"""
+
+    async def dependency(current_user = Depends(get_current_user)):
+        user_key = f"{action}:user:{current_user.email}"
+        global_key = f"{action}:global"
+
+        user_rate = settings.USER_RATE_LIMITS.get(action)
+        if user_rate and await limit_store.hit(user_key, RATE_WINDOW_SECONDS) > user_rate:
+            raise _too_many(f"Rate limit exceeded for {action}", RATE_WINDOW_SECONDS)
+        global_rate = settings.GLOBAL_RATE_LIMITS.get(action)
+        if global_rate and await limit_store.hit(global_key, RATE_WINDOW_SECONDS) > global_rate:
+            raise _too_many(f"Service is busy, try {action} again shortly", RATE_WINDOW_SECONDS)
+
+        acquired = []
+        try:
+            for key, limit in (
+                (user_key, settings.USER_CONCURRENCY_LIMITS.get(action)),
+                (global_key, settings.GLOBAL_CONCURRENCY_LIMITS.get(action)),
+            ):
+                if not limit:
+                    continue
+                if not await limit_store.acquire(key, limit):
+                    raise _too_many(f"Too many concurrent {action} requests", 1)
+                acquired.append(key)
+            yield current_user
+        finally:
+            for key in acquired:
+                await limit_store.release(key)
+
+    return dependency
@@ -1,11 +1,13 @@
 from .user import UserCreate, UserLogin, UserResponse, UserUpdate
-from .document import DocumentCreate, DocumentResponse, DocumentUpdate
-from .analysis import AnalysisCreate, AnalysisResponse
+from .document import DocumentCreate, DocumentResponse, DocumentUpdate, SearchResult, DocumentChunk
+from .analysis import AnalysisCreate, AnalysisResponse, ClauseFlag, ClauseCount, ClauseSummary
 from .auth import Token, TokenData
+from .job import JobStatus
 
 __all__ = [
     "UserCreate", "UserLogin", "UserResponse", "UserUpdate",
-    "DocumentCreate", "DocumentResponse", "DocumentUpdate",
-    "AnalysisCreate", "AnalysisResponse",
-    "Token", "TokenData"
+    "DocumentCreate", "DocumentResponse", "DocumentUpdate", "SearchResult", "DocumentChunk",
+    "AnalysisCreate", "AnalysisResponse", "ClauseFlag", "ClauseCount", "ClauseSummary",
+    "Token", "TokenData",
+    "JobStatus"
 ]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from datetime import datetime
 
 class AnalysisBase(BaseModel):
@@ -23,3 +23,22 @@ class AnalysisResponse(AnalysisBase):
 
     class Config:
         from_attributes = True
+
+class ClauseFlag(BaseModel):
+    clause_id: str
+    category: str
+    severity: str
+    similarity: float
+    excerpt: str
+    occurrences: int
+
+class ClauseCount(BaseModel):
+    clause_id: str
+    category: str
+    severity: str
+    documents: int
+    occurrences: int
+
+class ClauseSummary(BaseModel):
+    documents_indexed: int
+    clauses: List[ClauseCount]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 from .analysis import AnalysisResponse
 
@@ -26,3 +26,13 @@ class DocumentResponse(DocumentBase):
 
     class Config:
         from_attributes = True
+
+class SearchResult(BaseModel):
+    content: str
+    metadata: Dict[str, Any]
+    similarity_score: float
+
+class DocumentChunk(BaseModel):
+    index: int
+    count: int
+    text: str
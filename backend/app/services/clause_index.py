@@ -0,0 +1,300 @@
+import re
+import zlib
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import numpy as np
+
+# Known risky clause patterns. Examples are typical phrasings; matching is fuzzy
+# so near-variants in real contracts are caught without a model call.
+CLAUSE_LIBRARY = [
+    {
+        "id": "unilateral_rate_change",
+        "category": "Unilateral rate change",
+        "severity": "high",
+        "examples": [
+            "the interest rate may be adjusted by the lender at its sole discretion without prior notice to the borrower",
+            "the lender may change the interest rate from time to time at its sole discretion without notification",
+            "rates and fees may be changed by us at any time in our sole discretion without prior notice to you",
+        ],
+    },
+    {
+        "id": "mac_acceleration",
+        "category": "Acceleration on material adverse change",
+        "severity": "high",
+        "examples": [
+            "if the lender determines that a material adverse change has occurred in the borrower's financial condition the lender may declare the entire outstanding principal immediately due and payable",
+            "upon the occurrence of a material adverse change the lender may at its option declare all amounts immediately due and payable without presentment demand protest or notice",
+            "all obligations shall become immediately due and payable without presentment demand protest or other notice of any kind",
+        ],
+    },
+    {
+        "id": "blanket_security_interest",
+        "category": "Blanket security interest",
+        "severity": "high",
+        "examples": [
+            "the borrower grants to the lender a security interest in all of the borrower's property whether real or personal tangible or intangible now owned or hereafter acquired",
+            "grants a first priority security interest in and to all assets now owned or hereafter acquired and all proceeds and products thereof",
+        ],
+    },
+    {
+        "id": "jury_trial_waiver",
+        "category": "Jury trial waiver",
+        "severity": "medium",
+        "examples": [
+            "the borrower expressly waives any right to a jury trial",
+            "waiver of any right to a jury trial",
+            "each party hereby knowingly voluntarily and intentionally waives any right to a trial by jury in any action or proceeding",
+        ],
+    },
+    {
+        "id": "class_action_waiver",
+        "category": "Class action waiver",
+        "severity": "medium",
+        "examples": [
+            "waives any right to participate in any class action lawsuit",
+            "you agree that any claims will be brought in an individual capacity and not as a plaintiff or class member in any class action or representative proceeding",
+        ],
+    },
+    {
+        "id": "one_sided_arbitration",
+        "category": "Arbitration chosen by the other party",
+        "severity": "medium",
+        "examples": [
+            "all disputes shall be subject to binding arbitration in a venue selected by the lender",
+            "any dispute shall be resolved by binding arbitration before an arbitrator selected by the company in a location of its choosing",
+        ],
+    },
+    {
+        "id": "prepayment_penalty",
+        "category": "Prepayment penalty",
+        "severity": "medium",
+        "examples": [
+            "subject to a prepayment fee equal to all interest that would have accrued through the remainder of the loan term had the loan not been prepaid",
+            "any prepayment shall be accompanied by a prepayment premium equal to the interest that would have been payable through the maturity date",
+        ],
+    },
+    {
+        "id": "broad_indemnification",
+        "category": "Broad indemnification",
+        "severity": "medium",
+        "examples": [
+            "agrees to indemnify and hold harmless the lender its officers agents and employees from any and all claims damages liabilities and expenses including reasonable attorneys fees",
+            "shall indemnify defend and hold harmless the company from and against any and all losses claims damages liabilities costs and expenses arising out of or in connection with this agreement",
+        ],
+    },
+    {
+        "id": "setoff_waiver",
+        "category": "Waiver of defenses and set-off",
+        "severity": "medium",
+        "examples": [
+            "expressly waives any and all rights and defenses against the lender including the right to offset any amounts owed",
+            "payments shall be made without set-off counterclaim or deduction and the borrower waives all defenses",
+        ],
+    },
+    {
+        "id": "unilateral_amendment",
+        "category": "Unilateral amendment",
+        "severity": "medium",
+        "examples": [
+            "we may amend or modify the terms of this agreement at any time in our sole discretion by posting the revised terms",
+            "the landlord may change the rules and terms of this lease at any time upon notice to the tenant",
+        ],
+    },
+    {
+        "id": "automatic_renewal",
+        "category": "Automatic renewal",
+        "severity": "low",
+        "examples": [
+            "this agreement shall automatically renew for successive terms unless either party gives written notice of non-renewal at least days before the end of the then current term",
+        ],
+    },
+]
+
+NUM_PERM = 126
+BANDS = 42  # 42 bands x 3 rows ~ candidate threshold around 0.29 Jaccard
+ROWS = NUM_PERM // BANDS
+# Short and long windows so both terse and wordy clause patterns line up with one
+WINDOW_SIZES = (12, 30)
+WINDOW_STRIDE = 6
+# Minimum estimated share of a pattern's bigrams present in a window
+MATCH_THRESHOLD = 0.5
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(20250903)
+_PERM_A = _rng.randint(1, _PRIME, size=NUM_PERM, dtype=np.int64)
+_PERM_B = _rng.randint(0, _PRIME, size=NUM_PERM, dtype=np.int64)
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Filler words carry no signal about which clause a window is
+_STOPWORDS = {
+    "a", "an", "and", "any", "as", "at", "be", "by", "for", "from", "in", "is", "it",
+    "of", "on", "or", "shall", "such", "that", "the", "this", "to", "with", "its",
+}
+
+
+def _words(text: str) -> List[str]:
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def _shingles(words: List[str]) -> np.ndarray:
+    """Hash word bigrams to 31-bit integers"""
+    grams = {" ".join(words[i:i + 2]) for i in range(max(1, len(words) - 1))}
+    return np.fromiter((zlib.crc32(gram.encode()) & _PRIME for gram in grams), dtype=np.int64)
+
+
+def minhash(words: List[str]) -> Tuple[np.ndarray, int]:
+    """MinHash signature of a word sequence's bigram set, and the set's size"""
+    hashes = _shingles(words)
+    # (a * x + b) mod p for every permutation and shingle at once; products fit in int64
+    return ((np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME).min(axis=1), len(hashes)
+
+
+def containment(jaccard: np.ndarray, sizes: np.ndarray, pattern_sizes: np.ndarray) -> np.ndarray:
+    """Estimate the share of each pattern's shingles contained in each window from MinHash Jaccard"""
+    intersection = jaccard * (sizes + pattern_sizes) / (1 + jaccard)
+    return np.minimum(1.0, intersection / pattern_sizes)
+
+
+def window_signatures(text: str) -> Tuple[List[str], List[Tuple[int, int]], np.ndarray, np.ndarray]:
+    """MinHash signatures of every overlapping word window of a chunk, computed together.
+
+    Returns the chunk's raw tokens, each window's (start, end) token span, the
+    signatures (one row per window) and each window's bigram set size. Bigrams
+    are hashed and permuted once per chunk; a window's signature is the minimum
+    over its rows of that table, taken for all windows in one padded ``min``.
+    """
+    raw = text.split()
+    words: List[str] = []
+    offsets = [0]  # Position in words of each raw token's first word
+    for token in raw:
+        words.extend(_words(token))
+        offsets.append(len(words))
+
+    spans: List[Tuple[int, int]] = []
+    ranges: List[Tuple[int, int]] = []  # Bigram positions [first, last] of each window
+    for size in WINDOW_SIZES:
+        last = max(1, len(raw) - size + WINDOW_STRIDE)
+        for start in range(0, last, WINDOW_STRIDE):
+            end = min(start + size, len(raw))
+            first_word, end_word = offsets[start], offsets[end]
+            if end_word - first_word >= 4:
+                spans.append((start, end))
+                ranges.append((first_word, end_word - 2))
+    if not spans:
+        return raw, spans, np.zeros((0, NUM_PERM), dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    pairs = list(map(" ".join, zip(words, words[1:])))
+    # Repeated bigrams are hashed once
+    gram_hashes = {gram: zlib.crc32(gram.encode()) & _PRIME for gram in dict.fromkeys(pairs)}
+    grams = np.fromiter(map(gram_hashes.__getitem__, pairs), dtype=np.int64, count=len(pairs))
+    # (a * x + b) mod p for every permutation and bigram position; products fit in int64
+    permuted = (np.outer(grams, _PERM_A) + _PERM_B) % _PRIME
+    bounds = np.array(ranges, dtype=np.int64)
+    # Pad short windows by repeating their last bigram, which changes neither minimum nor set
+    positions = np.minimum(bounds[:, :1] + np.arange(int((bounds[:, 1] - bounds[:, 0]).max()) + 1),
+                           bounds[:, 1:])
+    signatures = permuted[positions].min(axis=1)
+    ordered = np.sort(grams[positions], axis=1)
+    sizes = 1 + np.count_nonzero(np.diff(ordered, axis=1), axis=1)
+    return raw, spans, signatures, sizes
+
+
+class ClauseIndex:
+    """LSH index of known risky clauses, matched against document chunks at ingest"""
+
+    def __init__(self, library: List[Dict[str, Any]] = CLAUSE_LIBRARY):
+        self.clauses = {clause["id"]: clause for clause in library}
+        self.patterns: List[str] = []  # Clause id of each pattern
+        signatures, sizes = [], []
+        for clause in library:
+            for example in clause["examples"]:
+                signature, size = minhash(_words(example))
+                self.patterns.append(clause["id"])
+                signatures.append(signature)
+                sizes.append(size)
+        self.signatures = np.array(signatures, dtype=np.int64).reshape(-1, NUM_PERM)
+        self.sizes = np.array(sizes, dtype=np.int64)
+        self.document_flags: Dict[str, List[Dict[str, Any]]] = {}
+
+    def match(self, text: str) -> List[Dict[str, Any]]:
+        """Best match per known clause found anywhere in text"""
+        best: Dict[str, Dict[str, Any]] = {}
+        raw, spans, signatures, sizes = window_signatures(text)
+        if not spans or not self.patterns:
+            return []
+        # Every window against every pattern at once; the library is small, so this
+        # beats per-window bucket lookups. A pattern is a candidate when all rows of
+        # one of its bands agree with the window, as in a banded LSH lookup.
+        equal = signatures[:, None, :] == self.signatures[None, :, :]
+        rows = equal.reshape(len(spans), len(self.patterns), BANDS, ROWS)
+        bands = rows[..., 0].copy()
+        for row in range(1, ROWS):
+            bands &= rows[..., row]
+        candidates = bands.any(axis=2)
+        jaccard = np.count_nonzero(equal, axis=2) / NUM_PERM
+        similarity = containment(jaccard, sizes[:, None], self.sizes[None, :])
+        for window, pattern_id in zip(*np.nonzero(candidates & (similarity >= MATCH_THRESHOLD))):
+            clause_id = self.patterns[pattern_id]
+            score = float(similarity[window, pattern_id])
+            if clause_id not in best or score > best[clause_id]["similarity"]:
+                clause = self.clauses[clause_id]
+                start, end = spans[window]
+                best[clause_id] = {
+                    "clause_id": clause_id,
+                    "category": clause["category"],
+                    "severity": clause["severity"],
+                    "similarity": round(score, 2),
+                    "excerpt": " ".join(raw[start:end]),
+                }
+        return sorted(best.values(), key=lambda flag: -flag["similarity"])
+
+    def index_document(self, document_id: str, chunks: List[str],
+                       progress: Optional[Callable[[str, int, int], None]] = None) -> List[Dict[str, Any]]:
+        """Flag known clauses in a document's chunks and remember them for library summaries"""
+        flags: Dict[str, Dict[str, Any]] = {}
+        for done, chunk in enumerate(chunks, 1):
+            for flag in self.match(chunk):
+                current = flags.get(flag["clause_id"])
+                if current is None:
+                    flags[flag["clause_id"]] = {**flag, "occurrences": 1}
+                else:
+                    current["occurrences"] += 1
+                    if flag["similarity"] > current["similarity"]:
+                        current.update(similarity=flag["similarity"], excerpt=flag["excerpt"])
+            if progress:
+                progress("index", done, len(chunks))
+        self.document_flags[document_id] = list(flags.values())
+        return self.document_flags[document_id]
+
+    def get_flags(self, document_id: str):
+        return self.document_flags.get(document_id)
+
+    def set_flags(self, document_id: str, flags: List[Dict[str, Any]]):
+        """Adopt flags computed earlier, by this process or another"""
+        self.document_flags[document_id] = flags
+
+    def remove_document(self, document_id: str):
+        self.document_flags.pop(document_id, None)
+
+    def summary(self, document_ids: List[str]) -> Dict[str, Any]:
+        """Per-clause document and occurrence counts across a set of documents"""
+        counts: Dict[str, Dict[str, Any]] = {}
+        indexed = 0
+        for document_id in document_ids:
+            flags = self.document_flags.get(document_id)
+            if flags is None:
+                continue
+            indexed += 1
+            for flag in flags:
+                entry = counts.setdefault(flag["clause_id"], {
+                    "clause_id": flag["clause_id"],
+                    "category": flag["category"],
+                    "severity": flag["severity"],
+                    "documents": 0,
+                    "occurrences": 0,
+                })
+                entry["documents"] += 1
+                entry["occurrences"] += flag["occurrences"]
+        return {
+            "documents_indexed": indexed,
+            "clauses": sorted(counts.values(), key=lambda entry: -entry["documents"]),
+        }
@@ -0,0 +1,183 @@
+import hashlib
+import queue
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _token_hashes(texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Row index and 32-bit hash of every word and word bigram in a batch of texts.
+
+    Each distinct word is hashed once per batch and bigram hashes are mixed in
+    NumPy, so larger batches share more of the per-word Python work.
+    """
+    words: List[str] = []
+    lengths: List[int] = []
+    for text in texts:
+        found = _WORD.findall(text.lower())
+        words.extend(found)
+        lengths.append(len(found))
+    vocabulary = {word: index for index, word in enumerate(dict.fromkeys(words))}
+    ids = np.fromiter(map(vocabulary.__getitem__, words), dtype=np.int64, count=len(words))
+    word_hashes = np.fromiter((zlib.crc32(word.encode()) for word in vocabulary), dtype=np.uint64,
+                              count=len(vocabulary))
+    hashes = word_hashes[ids]
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    # Bigrams never span two texts
+    same_text = rows[1:] == rows[:-1]
+    bigrams = ((hashes[:-1] * np.uint64(0x9E3779B1) + hashes[1:]) & np.uint64(0xFFFFFFFF))[same_text]
+    return np.concatenate([rows, rows[1:][same_text]]), np.concatenate([hashes, bigrams])
+
+
+def vectorize(texts: List[str], dim: int) -> np.ndarray:
+    """L2-normalized hashed bag-of-words vectors, one row per text.
+
+    Features of the whole batch are counted in a single ``bincount`` over
+    (row, bucket) pairs, so per-text NumPy overhead is paid once per batch.
+    """
+    rows, hashes = _token_hashes(texts)
+    buckets = (hashes % np.uint64(dim)).astype(np.int64)
+    # Unsigned counts: a one-word query can never cancel out against a colliding feature
+    counts = np.bincount(rows * dim + buckets, minlength=len(texts) * dim).reshape(len(texts), dim)
+    vectors = np.log1p(counts)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+
+class EmbeddingService:
+    """Embeds chunk texts in micro-batches with a cache keyed by content hash.
+
+    Callers on any thread block on ``embed``; a single batcher thread gathers
+    their texts until ``batch_size`` are waiting or the oldest has waited
+    ``max_wait_ms``, then vectorizes them together. Without concurrent callers
+    batches are flushed at once instead of waiting for the deadline. Identical chunks, such as
+    boilerplate shared across contracts, are embedded once.
+    """
+
+    def __init__(self, dim: Optional[int] = None, batching: Optional[bool] = None,
+                 batch_size: Optional[int] = None, max_wait_ms: Optional[int] = None,
+                 cache_size: Optional[int] = None):
+        self.dim = dim or settings.EMBEDDING_DIM
+        self.batching = settings.EMBEDDING_BATCHING if batching is None else batching
+        self.batch_size = batch_size or settings.EMBEDDING_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else settings.EMBEDDING_BATCH_WAIT_MS) / 1000
+        self.cache_size = settings.EMBEDDING_CACHE_SIZE if cache_size is None else cache_size
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._stats = {"requested": 0, "cache_hits": 0, "embedded": 0, "batches": 0, "embed_seconds": 0.0}
+
+    def embed(self, texts: List[str], cache: bool = True) -> np.ndarray:
+        """Vectors for texts, one row each; ``cache=False`` skips the cache for one-off texts"""
+        keys = [hashlib.sha1(text.encode("utf-8")).digest() for text in texts]
+        vectors: Dict[bytes, np.ndarray] = {}
+        if cache:
+            with self._lock:
+                for key in keys:
+                    if key in self._cache:
+                        self._cache.move_to_end(key)
+                        vectors[key] = self._cache[key]
+        hits = sum(1 for key in keys if key in vectors)
+
+        misses: Dict[bytes, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                misses.setdefault(key, text)
+        if misses:
+            computed = self._compute(list(misses.values()))
+            vectors.update(zip(misses, computed))
+            if cache:
+                with self._lock:
+                    for key in misses:
+                        self._cache[key] = vectors[key]
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        if cache:
+            with self._lock:
+                self._stats["requested"] += len(texts)
+                self._stats["cache_hits"] += hits
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.vstack([vectors[key] for key in keys])
+
+    def _compute(self, texts: List[str]) -> List[np.ndarray]:
+        if not self.batching:
+            # One chunk at a time; kept as the baseline for bench_embeddings.py
+            return [self._vectorize([text])[0] for text in texts]
+        future: Future = Future()
+        self._ensure_worker()
+        self._pending.put((texts, future))
+        return future.result()
+
+    def _vectorize(self, texts: List[str]) -> np.ndarray:
+        started = time.perf_counter()
+        vectors = vectorize(texts, self.dim)
+        with self._lock:
+            self._stats["embedded"] += len(texts)
+            self._stats["batches"] += 1
+            self._stats["embed_seconds"] += time.perf_counter() - started
+        return vectors
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        # Only wait out the deadline while callers are actually overlapping; a lone
+        # caller would otherwise pay max_wait on every call for nothing
+        concurrent = False
+        while True:
+            batch = [self._pending.get()]
+            size = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.batch_size:
+                remaining = deadline - time.monotonic() if concurrent else 0
+                try:
+                    if remaining > 0:
+                        batch.append(self._pending.get(timeout=remaining))
+                    else:
+                        batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+                size += len(batch[-1][0])
+            concurrent = len(batch) > 1
+
+            try:
+                vectors = self._vectorize([text for texts, _ in batch for text in texts])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for texts, future in batch:
+                future.set_result(list(vectors[offset:offset + len(texts)]))
+                offset += len(texts)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            cached = len(self._cache)
+        return {
+            "dim": self.dim,
+            "batching": self.batching,
+            "requested": stats["requested"],
+            "embedded": stats["embedded"],
+            "cache_hits": stats["cache_hits"],
+            "cache_hit_rate": round(stats["cache_hits"] / stats["requested"], 3) if stats["requested"] else 0.0,
+            "cached_vectors": cached,
+            "batches": stats["batches"],
+            "avg_batch_size": round(stats["embedded"] / stats["batches"], 1) if stats["batches"] else 0.0,
+            "chunks_per_second": round(stats["embedded"] / stats["embed_seconds"]) if stats["embed_seconds"] else 0,
+        }
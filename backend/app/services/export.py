@@ -0,0 +1,68 @@
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, Iterator
+from sqlalchemy.orm import Query
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 500
+
+EXPORT_FIELDS = [
+    "document_id", "original_filename", "status", "mime_type", "file_size", "document_created_at",
+    "analysis_id", "analysis_type", "confidence_score", "processing_time", "analysis_created_at",
+    "simplified_text",
+]
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def iter_export_rows(query: Query) -> Iterator[Dict[str, Any]]:
+    """Stream (Document, Analysis) rows as flat dicts without loading the result set"""
+    for document, analysis in query.yield_per(EXPORT_BATCH_SIZE):
+        row = {
+            "document_id": document.id,
+            "original_filename": document.original_filename,
+            "status": document.status,
+            "mime_type": document.mime_type,
+            "file_size": document.file_size,
+            "document_created_at": _iso(document.created_at),
+            "analysis_id": None,
+            "analysis_type": None,
+            "confidence_score": None,
+            "processing_time": None,
+            "analysis_created_at": None,
+            "simplified_text": None,
+            "analysis_data": None,
+        }
+        if analysis is not None:
+            row.update(
+                analysis_id=analysis.id,
+                analysis_type=analysis.analysis_type,
+                confidence_score=analysis.confidence_score,
+                processing_time=analysis.processing_time,
+                analysis_created_at=_iso(analysis.created_at),
+                simplified_text=analysis.simplified_text,
+                analysis_data=analysis.analysis_data,
+            )
+        yield row
+
+
+def ndjson_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False) + "\n"
+
+
+def csv_lines(rows: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    """CSV with a header row; structured analysis_data is left to the NDJSON format"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,11 @@
+from .base import (
+    MIME_TYPES, UnsupportedFormatError, EmptyDocumentError, PageText, register, sniff_format,
+    iter_text_blocks, extract_text
+)
+# Importing the plugins registers them
+from . import pdf, docx, txt, doc
+
+__all__ = [
+    "MIME_TYPES", "UnsupportedFormatError", "EmptyDocumentError", "PageText", "register",
+    "sniff_format", "iter_text_blocks", "extract_text"
+]
@@ -0,0 +1,99 @@
+import zipfile
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Sniffed format -> canonical MIME type stored on the document
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "doc": "application/msword",
+    "txt": "text/plain",
+}
+
+SNIFF_BYTES = 8192
+
+EXTRACTORS: Dict[str, Callable[[str], Iterator[str]]] = {}
+# Optional cheap block counts, so extraction progress can be reported as a percentage
+BLOCK_COUNTERS: Dict[str, Callable[[str], int]] = {}
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised when a file's contents match no registered extractor"""
+
+
+class EmptyDocumentError(ValueError):
+    """Raised when a document yields no text at all, e.g. a scan when OCR is unavailable"""
+
+
+class PageText(str):
+    """Text of one page, annotated with how it was obtained and how long that took"""
+
+    def __new__(cls, text: str, page: int, method: str, ms: float):
+        block = super().__new__(cls, text)
+        block.page = page
+        block.method = method  # text, ocr, ocr-cached or ocr-failed
+        block.ms = ms
+        return block
+
+    def report(self) -> Dict[str, Any]:
+        return {"page": self.page, "method": self.method, "ms": round(self.ms, 1), "chars": len(self)}
+
+
+def register(fmt: str, count: Optional[Callable[[str], int]] = None):
+    """Register a generator function yielding text blocks for a sniffed format"""
+    def decorator(func: Callable[[str], Iterator[str]]):
+        EXTRACTORS[fmt] = func
+        if count is not None:
+            BLOCK_COUNTERS[fmt] = count
+        return func
+    return decorator
+
+
+def _looks_like_text(head: bytes) -> bool:
+    if head.startswith((b"\xef\xbb\xbf", b"\xff\xfe", b"\xfe\xff")):
+        return True
+    # UTF-16 without a BOM has NULs in every other byte of ASCII text
+    if head and (head[1::2].count(0) > len(head) * 0.4 or head[0::2].count(0) > len(head) * 0.4):
+        return True
+    return b"\x00" not in head
+
+
+def sniff_format(file_path: str) -> str:
+    """Identify a file's format from its leading bytes, ignoring name and client MIME type"""
+    with open(file_path, "rb") as file:
+        head = file.read(SNIFF_BYTES)
+
+    if head.startswith(b"%PDF-"):
+        return "pdf"
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return "docx"
+        except zipfile.BadZipFile:
+            pass
+        raise UnsupportedFormatError("ZIP archive is not a Word document")
+    if head.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+        return "doc"
+    if _looks_like_text(head):
+        return "txt"
+    raise UnsupportedFormatError("Unrecognized binary file format")
+
+
+def iter_text_blocks(file_path: str, progress: Optional[Callable[[str, int, int], None]] = None) -> Iterator[str]:
+    """Yield a document's text block by block using the extractor for its sniffed format"""
+    fmt = sniff_format(file_path)
+    extractor = EXTRACTORS.get(fmt)
+    if extractor is None:
+        raise UnsupportedFormatError(f"No extractor registered for {fmt}")
+    if progress is None:
+        yield from extractor(file_path)
+        return
+    total = BLOCK_COUNTERS[fmt](file_path) if fmt in BLOCK_COUNTERS else 0
+    for done, block in enumerate(extractor(file_path), 1):
+        yield block
+        progress("extract", done, total)
+
+
+def extract_text(file_path: str, progress: Optional[Callable[[str, int, int], None]] = None) -> str:
+    """Extract a document's full text, joining the streamed blocks once"""
+    return "\n".join(block for block in iter_text_blocks(file_path, progress) if block)
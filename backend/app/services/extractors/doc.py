@@ -0,0 +1,70 @@
+import re
+import struct
+from typing import Iterator
+import olefile
+from .base import register, UnsupportedFormatError
+
+# Offsets into the Word 97-2003 File Information Block
+_FIB_MAGIC = 0xA5EC
+_FIB_FLAGS = 0x0A
+_FIB_WHICH_TABLE = 0x0200
+_FIB_BASE_SIZE = 32
+_FC_CLX_INDEX = 33  # fcClx/lcbClx pair within FibRgFcLcb97
+
+# Field instructions sit between 0x13 and 0x14; the displayed result follows until 0x15
+_FIELD_CODE = re.compile("\x13[^\x13\x14\x15]*\x14?|\x15")
+_CONTROL = re.compile("[\x00-\x08\x0b\x0e-\x1f]")
+
+
+def _clean(text: str) -> str:
+    text = _FIELD_CODE.sub("", text)
+    # Paragraph and cell marks, page and section breaks
+    text = text.replace("\r", "\n").replace("\x07", "\t").replace("\x0c", "\n")
+    return _CONTROL.sub("", text)
+
+
+def _fc_clx(word: bytes):
+    csw = struct.unpack_from("<H", word, _FIB_BASE_SIZE)[0]
+    offset = _FIB_BASE_SIZE + 2 + csw * 2
+    cslw = struct.unpack_from("<H", word, offset)[0]
+    offset += 2 + cslw * 4 + 2  # skip rgLw and cbRgFcLcb
+    return struct.unpack_from("<II", word, offset + _FC_CLX_INDEX * 8)
+
+
+def _piece_table(clx: bytes) -> bytes:
+    """Skip the property runs at the start of the Clx and return the PlcPcd"""
+    offset = 0
+    while offset < len(clx) and clx[offset] == 0x01:
+        offset += 3 + struct.unpack_from("<H", clx, offset + 1)[0]
+    if offset >= len(clx) or clx[offset] != 0x02:
+        raise UnsupportedFormatError("Word document has no piece table")
+    size = struct.unpack_from("<I", clx, offset + 1)[0]
+    return clx[offset + 5:offset + 5 + size]
+
+
+@register("doc")
+def extract_doc(file_path: str) -> Iterator[str]:
+    """Yield the text pieces of a legacy Word 97-2003 document via its piece table"""
+    with olefile.OleFileIO(file_path) as ole:
+        if not ole.exists("WordDocument"):
+            raise UnsupportedFormatError("OLE file is not a Word document")
+        word = ole.openstream("WordDocument").read()
+        if struct.unpack_from("<H", word, 0)[0] != _FIB_MAGIC:
+            raise UnsupportedFormatError("Unrecognized Word document version")
+        flags = struct.unpack_from("<H", word, _FIB_FLAGS)[0]
+        table_name = "1Table" if flags & _FIB_WHICH_TABLE else "0Table"
+        fc_clx, lcb_clx = _fc_clx(word)
+        table = ole.openstream(table_name).read()
+
+    plc = _piece_table(table[fc_clx:fc_clx + lcb_clx])
+    count = (len(plc) - 4) // 12
+    cps = struct.unpack_from(f"<{count + 1}I", plc, 0)
+    for i in range(count):
+        fc = struct.unpack_from("<I", plc, (count + 1) * 4 + i * 8 + 2)[0]
+        length = cps[i + 1] - cps[i]
+        if fc & 0x40000000:
+            start = (fc & ~0x40000000) // 2
+            text = word[start:start + length].decode("cp1252", errors="replace")
+        else:
+            text = word[fc:fc + 2 * length].decode("utf-16-le", errors="replace")
+        yield _clean(text)
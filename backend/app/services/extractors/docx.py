@@ -0,0 +1,29 @@
+from typing import Iterator
+from docx import Document as DocxDocument
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+from .base import register
+
+
+def _table_rows(table: Table) -> Iterator[str]:
+    for row in table.rows:
+        cells = []
+        for cell in row.cells:
+            text = cell.text.strip()
+            # Merged cells are repeated once per grid column
+            if text and (not cells or cells[-1] != text):
+                cells.append(text)
+        if cells:
+            yield " | ".join(cells)
+
+
+@register("docx")
+def extract_docx(file_path: str) -> Iterator[str]:
+    """Yield paragraphs and table rows in document order"""
+    doc = DocxDocument(file_path)
+    for child in doc.element.body.iterchildren():
+        if child.tag == qn("w:p"):
+            yield Paragraph(child, doc).text
+        elif child.tag == qn("w:tbl"):
+            yield from _table_rows(Table(child, doc))
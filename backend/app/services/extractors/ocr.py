@@ -0,0 +1,91 @@
+import hashlib
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Optional, Tuple
+from app.core.config import settings
+from .base import PageText
+
+try:
+    import pytesseract
+    from pdf2image import convert_from_path
+except ImportError:  # OCR is optional; scanned pages then stay empty
+    pytesseract = None
+    convert_from_path = None
+
+_pool: Optional[ProcessPoolExecutor] = None
+_cache: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def ocr_available() -> bool:
+    return settings.OCR_ENABLED and pytesseract is not None
+
+
+def file_digest(file_path: str) -> str:
+    """Content hash of a file, so identical re-uploads share cached pages"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        while block := file.read(1024 * 1024):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _ocr_page(file_path: str, page: int, dpi: int, language: str) -> Tuple[str, float]:
+    """Render one page and recognize its text; runs in a worker process"""
+    started = time.perf_counter()
+    images = convert_from_path(file_path, dpi=dpi, first_page=page, last_page=page)
+    text = "\n".join(pytesseract.image_to_string(image, lang=language) for image in images)
+    return text, (time.perf_counter() - started) * 1000
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            # Spawn rather than fork: the API process runs threads that may hold locks
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.OCR_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _pool
+
+
+def submit_page(file_path: str, digest: str, page: int, fallback: str = "") -> "Future[PageText]":
+    """OCR one page in the process pool, resolving to its text; cached pages resolve at once.
+
+    A failed page resolves to ``fallback`` (its native text) rather than failing
+    the document.
+    """
+    result: "Future[PageText]" = Future()
+    key = (digest, page)
+    with _lock:
+        cached = _cache.get(key)
+        if cached is not None:
+            _cache.move_to_end(key)
+    if cached is not None:
+        result.set_result(PageText(cached, page, "ocr-cached", 0.0))
+        return result
+
+    submitted = time.perf_counter()
+
+    def done(future: Future):
+        try:
+            text, ms = future.result()
+        except Exception:
+            result.set_result(PageText(fallback, page, "ocr-failed", (time.perf_counter() - submitted) * 1000))
+            return
+        with _lock:
+            _cache[key] = text
+            while len(_cache) > settings.OCR_CACHE_PAGES:
+                _cache.popitem(last=False)
+        result.set_result(PageText(text, page, "ocr", ms))
+
+    try:
+        future = _get_pool().submit(_ocr_page, file_path, page, settings.OCR_DPI, settings.OCR_LANGUAGE)
+    except Exception:
+        result.set_result(PageText(fallback, page, "ocr-failed", 0.0))
+        return result
+    future.add_done_callback(done)
+    return result
@@ -0,0 +1,56 @@
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Iterator, Union
+import PyPDF2
+from app.core.config import settings
+from .base import PageText, register
+from .ocr import file_digest, ocr_available, submit_page
+
+
+def count_pages(file_path: str) -> int:
+    with open(file_path, "rb") as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def _has_images(page) -> bool:
+    resources = page.get("/Resources")
+    xobjects = resources.get_object().get("/XObject") if resources else None
+    if not xobjects:
+        return False
+    return any(xobject.get_object().get("/Subtype") == "/Image" for xobject in xobjects.get_object().values())
+
+
+def _looks_scanned(page, text: str) -> bool:
+    """No usable text layer but an image to read it from"""
+    return len(text.strip()) < settings.OCR_MIN_CHARS and _has_images(page)
+
+
+@register("pdf", count=count_pages)
+def extract_pdf(file_path: str) -> Iterator[PageText]:
+    """Yield the text of each page in order; pages are parsed lazily.
+
+    Pages without a text layer are OCR'd in a process pool while later pages
+    are read, and yielded in their place once recognized.
+    """
+    pending: Deque[Union[PageText, "Future[PageText]"]] = deque()
+    digest = None
+    with open(file_path, "rb") as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for number, page in enumerate(pdf_reader.pages, 1):
+            started = time.perf_counter()
+            text = page.extract_text() or ""
+            elapsed = (time.perf_counter() - started) * 1000
+            if ocr_available() and _looks_scanned(page, text):
+                digest = digest or file_digest(file_path)
+                pending.append(submit_page(file_path, digest, number, fallback=text))
+            else:
+                pending.append(PageText(text, number, "text", elapsed))
+            while pending and (isinstance(pending[0], str) or pending[0].done()):
+                yield _resolve(pending.popleft())
+    while pending:
+        yield _resolve(pending.popleft())
+
+
+def _resolve(block: Union[PageText, "Future[PageText]"]) -> PageText:
+    return block if isinstance(block, str) else block.result()
@@ -0,0 +1,68 @@
+import codecs
+from typing import Iterator
+from .base import register
+
+BLOCK_SIZE = 64 * 1024
+# Windows-1252 is a superset of Latin-1 for printable text and the usual legacy export encoding
+FALLBACK_ENCODING = "cp1252"
+
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(head: bytes) -> str:
+    """Guess an encoding from the first block of a file"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    if head[1::2].count(0) > len(head) * 0.4:
+        return "utf-16-le"
+    if head[0::2].count(0) > len(head) * 0.4:
+        return "utf-16-be"
+    try:
+        # The block may end inside a multi-byte sequence; that alone is fine
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING
+
+
+@register("txt")
+def extract_txt(file_path: str) -> Iterator[str]:
+    """Yield decoded blocks, switching to the fallback encoding if UTF-8 turns out wrong later"""
+    with open(file_path, "rb") as file:
+        block = file.read(BLOCK_SIZE)
+        encoding = detect_encoding(block)
+        decoder = codecs.getincrementaldecoder(encoding)(errors="strict" if encoding == "utf-8" else "replace")
+        pending = ""
+        while block:
+            try:
+                text = decoder.decode(block)
+            except UnicodeDecodeError as e:
+                # Keep the valid UTF-8 prefix and decode the rest as legacy text
+                data = decoder.getstate()[0] + block
+                decoder = codecs.getincrementaldecoder(FALLBACK_ENCODING)(errors="replace")
+                text = data[:e.start].decode("utf-8") + decoder.decode(data[e.start:])
+            # Hand out whole lines (or words, for huge lines) so blocks never split a word
+            text = pending + text
+            cut = text.rfind("\n")
+            if cut == -1 and len(text) > BLOCK_SIZE:
+                cut = text.rfind(" ")
+            if cut == -1:
+                pending = text
+            else:
+                yield text[:cut]
+                pending = text[cut + 1:]
+            block = file.read(BLOCK_SIZE)
+        try:
+            pending += decoder.decode(b"", final=True)
+        except UnicodeDecodeError:
+            # A legacy file can end in an accented byte that looked like the start of a UTF-8 sequence
+            pending += decoder.getstate()[0].decode(FALLBACK_ENCODING, errors="replace")
+        if pending:
+            yield pending
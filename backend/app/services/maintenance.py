@@ -0,0 +1,161 @@
+import asyncio
+import glob
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+from sqlalchemy import func, select, union
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.core.cache import response_cache
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.analysis import Analysis
+from app.models.document import Document
+from app.services.text_store import CLAUSES_SUFFIX, PAGES_SUFFIX, SUFFIX
+from app.services.vector_index import VectorIndex
+
+# Files kept next to an upload, removed with it and collected when orphaned
+SIDECAR_SUFFIXES = (SUFFIX, PAGES_SUFFIX, CLAUSES_SUFFIX)
+# Sidecars being written go through "<upload><suffix>.<random>.tmp" first
+TEMP_PATTERN = ".*.tmp"
+DELETE_BATCH_SIZE = 500
+
+
+def _upload_name(name: str) -> str:
+    """Name of the upload a file in UPLOAD_DIR belongs to"""
+    for suffix in SIDECAR_SUFFIXES:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def delete_document_files(file_path: str) -> int:
+    """Remove an upload and its sidecar files, returning the bytes freed"""
+    freed = 0
+    temporary = glob.glob(glob.escape(file_path) + TEMP_PATTERN)
+    for path in [file_path] + [file_path + suffix for suffix in SIDECAR_SUFFIXES] + temporary:
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+def expire_analyses(db: Session) -> int:
+    """Delete analyses past the retention period or beyond the newest few per document"""
+    expired = []
+    if settings.ANALYSIS_RETENTION_DAYS:
+        cutoff = datetime.utcnow() - timedelta(days=settings.ANALYSIS_RETENTION_DAYS)
+        expired.append(
+            select(Analysis.id, Document.user_id)
+            .join(Document, Document.id == Analysis.document_id)
+            .where(Analysis.created_at < cutoff)
+        )
+    if settings.MAX_ANALYSES_PER_DOCUMENT:
+        ranked = select(
+            Analysis.id,
+            Document.user_id,
+            func.row_number().over(
+                partition_by=Analysis.document_id,
+                order_by=(Analysis.created_at.desc(), Analysis.id.desc())
+            ).label("newest_first")
+        ).join(Document, Document.id == Analysis.document_id).subquery()
+        expired.append(
+            select(ranked.c.id, ranked.c.user_id).where(ranked.c.newest_first > settings.MAX_ANALYSES_PER_DOCUMENT)
+        )
+    if not expired:
+        return 0
+
+    rows = db.execute(union(*expired)).all()
+    ids = [row[0] for row in rows]
+    for start in range(0, len(ids), DELETE_BATCH_SIZE):
+        db.query(Analysis).filter(
+            Analysis.id.in_(ids[start:start + DELETE_BATCH_SIZE])
+        ).delete(synchronize_session=False)
+    db.commit()
+    # Bulk deletes bypass the session hooks that normally invalidate cached reads
+    for user_id in {row[1] for row in rows}:
+        response_cache.invalidate(user_id)
+    return len(ids)
+
+
+def collect_orphans(db: Session) -> int:
+    """Remove files in UPLOAD_DIR that no document references, and stale temporary files"""
+    if not os.path.isdir(settings.UPLOAD_DIR):
+        return 0
+    referenced = {os.path.basename(path) for (path,) in db.query(Document.file_path)}
+    # Uploads are written before their row is committed, so leave recent files alone
+    cutoff = time.time() - settings.ORPHAN_GRACE_SECONDS
+    removed = 0
+    for entry in os.scandir(settings.UPLOAD_DIR):
+        if not entry.is_file():
+            continue
+        if _upload_name(entry.name) in referenced and not entry.name.endswith(".tmp"):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def compact_index(index: VectorIndex) -> Optional[int]:
+    """Compact after enough deletions, and rebuild periodically regardless.
+
+    Returns the number of tombstoned rows dropped, or None when nothing was due.
+    """
+    if index.needs_compaction(settings.INDEX_COMPACT_RATIO) or \
+            time.time() - index.last_rebuild >= settings.INDEX_REBUILD_SECONDS:
+        return index.compact()
+    return None
+
+
+class MaintenanceRunner:
+    """Periodically applies analysis retention, collects orphaned files and compacts the retrieval index"""
+
+    def __init__(self, rag_service):
+        self.rag_service = rag_service
+        self.last_run: Dict[str, Any] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def run_once(self) -> Dict[str, Any]:
+        started = time.time()
+        db = SessionLocal()
+        try:
+            report = {
+                "analyses_expired": expire_analyses(db),
+                "orphans_removed": collect_orphans(db),
+            }
+        finally:
+            db.close()
+        report["index_rows_compacted"] = compact_index(self.rag_service.vector_index)
+        report["documents_evicted"] = self.rag_service.enforce_memory_cap()
+        report["memory"] = self.rag_service.memory_stats()
+        report["duration_ms"] = round((time.time() - started) * 1000)
+        report["finished_at"] = datetime.now(timezone.utc).isoformat()
+        self.last_run = report
+        return report
+
+    async def _loop(self):
+        while True:
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception as e:
+                # A failed cycle is retried on the next one
+                self.last_run = {"error": str(e), "finished_at": datetime.now(timezone.utc).isoformat()}
+            await asyncio.sleep(settings.MAINTENANCE_INTERVAL_SECONDS)
+
+    def start(self):
+        if settings.MAINTENANCE_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
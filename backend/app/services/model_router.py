@@ -0,0 +1,85 @@
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional
+from app.core.config import settings, ModelSpec
+
+# Which model tier each task prefers; "analysis" is routed by document size
+TASK_TIERS = {
+    "map": "fast",
+    "merge": "fast",
+    "reduce": "large",
+}
+
+# Weight of the newest observation in the latency moving average
+LATENCY_ALPHA = 0.2
+
+
+class ModelRouter:
+    """Chooses a model per task from the registry and learns observed latencies"""
+
+    def __init__(self, models: Optional[List[ModelSpec]] = None):
+        self.models = {spec.name: spec for spec in (models or settings.LLM_MODELS)}
+        self.latency_ms: Dict[str, float] = {name: float(spec.latency_ms) for name, spec in self.models.items()}
+        self.calls: Dict[str, int] = {name: 0 for name in self.models}
+        self.failures: Dict[str, int] = {name: 0 for name in self.models}
+        self.decisions = deque(maxlen=500)
+
+    def get(self, name: str) -> Optional[ModelSpec]:
+        return self.models.get(name)
+
+    def expected_cost(self, spec: ModelSpec, input_tokens: int, output_tokens: int) -> float:
+        """Dollar cost of the call plus the configured price of its expected latency"""
+        dollars = (input_tokens * spec.input_cost + output_tokens * spec.output_cost) / 1_000_000
+        return dollars + self.latency_ms[spec.name] / 1000 * settings.ROUTER_COST_PER_SECOND
+
+    def choose(self, task: str, input_tokens: int, output_tokens: int) -> ModelSpec:
+        """Pick the cheapest model of the task's tier whose context fits the request"""
+        tier = TASK_TIERS.get(task)
+        if tier is None:
+            tier = "fast" if input_tokens <= settings.SHORT_DOCUMENT_TOKENS else "large"
+
+        fitting = [
+            spec for spec in self.models.values()
+            if spec.context_window >= input_tokens + output_tokens
+        ]
+        # Fall back to any tier, then to the largest window, rather than failing
+        candidates = [spec for spec in fitting if spec.tier == tier] or fitting or [
+            max(self.models.values(), key=lambda spec: spec.context_window)
+        ]
+        spec = min(candidates, key=lambda spec: self.expected_cost(spec, input_tokens, output_tokens))
+
+        self.decisions.append({
+            "task": task,
+            "tier": tier,
+            "model": spec.name,
+            "input_tokens": input_tokens,
+            "at": time.time(),
+        })
+        return spec
+
+    def record(self, model: str, latency_ms: float, ok: bool = True):
+        """Fold an observed call latency into the model's moving average"""
+        if model not in self.models:
+            return
+        self.calls[model] += 1
+        if not ok:
+            self.failures[model] += 1
+            return
+        self.latency_ms[model] += LATENCY_ALPHA * (latency_ms - self.latency_ms[model])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": [
+                {
+                    **spec.model_dump(),
+                    "observed_latency_ms": round(self.latency_ms[name]),
+                    "calls": self.calls[name],
+                    "failures": self.failures[name],
+                }
+                for name, spec in self.models.items()
+            ],
+            "recent_decisions": list(self.decisions)[-50:],
+        }
+
+
+model_router = ModelRouter()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, Optional, Set
+from sqlalchemy import event, inspect
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.document import Document
+
+# report(stage, done, total); a total of 0 means the total is not known yet
+ProgressCallback = Callable[[str, int, int], None]
+
+CHANNEL_PREFIX = "progress:"
+# Events buffered per open channel; the oldest are dropped for slow clients
+QUEUE_SIZE = 256
+
+
+class ProgressBroker:
+    """In-process pub/sub of per-user progress events.
+
+    ``publish`` may be called from worker threads; events are handed to the
+    event loop and fanned out to every open channel of that user.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def publish(self, user_id: int, event: Dict[str, Any]):
+        if self._loop is None or not self._subscribers.get(user_id):
+            return
+        self._loop.call_soon_threadsafe(self._deliver, user_id, event)
+
+    def _deliver(self, user_id: int, event: Dict[str, Any]):
+        for queue in self._subscribers.get(user_id, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        """Open a channel receiving the user's events until the context exits"""
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers[user_id].discard(queue)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def reporter(self, user_id: int, document_id: int, speculative: bool = False) -> ProgressCallback:
+        """Progress callback for one document's processing, publishing at most once per percent"""
+        last: Dict[str, Optional[int]] = {}
+
+        def report(stage: str, done: int, total: int):
+            percent = min(100, done * 100 // total) if total else None
+            if stage in last and last[stage] == percent and done != total:
+                return
+            last[stage] = percent
+            self.publish(user_id, {
+                "type": "progress",
+                "document_id": document_id,
+                "stage": stage,
+                "done": done,
+                "total": total or None,
+                "percent": percent,
+                "speculative": speculative,
+            })
+
+        return report
+
+
+class RedisProgressBroker(ProgressBroker):
+    """Progress events published through redis so every API worker can deliver them"""
+
+    def __init__(self, url: str):
+        super().__init__()
+        import redis
+        self.url = url
+        self.redis = redis.Redis.from_url(url)
+        self._listener: Optional[asyncio.Task] = None
+
+    def publish(self, user_id: int, event: Dict[str, Any]):
+        try:
+            self.redis.publish(f"{CHANNEL_PREFIX}{user_id}", json.dumps(event))
+        except Exception:
+            pass  # Progress is best effort and must never fail the work it reports on
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        async with super().subscribe(user_id) as queue:
+            yield queue
+
+    async def _listen(self):
+        """Relay every user's events from redis to the channels open in this worker"""
+        import redis.asyncio as aioredis
+        pubsub = aioredis.from_url(self.url).pubsub()
+        await pubsub.psubscribe(CHANNEL_PREFIX + "*")
+        async for message in pubsub.listen():
+            if message["type"] == "pmessage":
+                user_id = int(message["channel"].decode()[len(CHANNEL_PREFIX):])
+                self._deliver(user_id, json.loads(message["data"]))
+
+
+def create_progress_broker() -> ProgressBroker:
+    if settings.PROGRESS_STORE == "redis":
+        return RedisProgressBroker(settings.REDIS_URL)
+    return ProgressBroker()
+
+
+progress_broker = create_progress_broker()
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_status_changes(session, flush_context):
+    """Remember document status transitions written in this transaction"""
+    changes = session.info.setdefault("progress_status_changes", {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Document) and inspect(obj).attrs.status.history.added:
+            changes[obj.id] = (obj.user_id, obj.status)
+    for obj in session.deleted:
+        if isinstance(obj, Document):
+            changes[obj.id] = (obj.user_id, "deleted")
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_status_changes(session):
+    for document_id, (user_id, status) in session.info.pop("progress_status_changes", {}).items():
+        progress_broker.publish(user_id, {"type": "status", "document_id": document_id, "status": status})
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_status_changes(session):
+    session.info.pop("progress_status_changes", None)
@@ -0,0 +1,324 @@
+import math
+import re
+import unicodedata
+from typing import List, Dict, Any, Optional
+from app.core.config import settings
+
+# Context window assumed for models missing from the registry
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Tokens per "word piece" relative to the Llama 3 tokenizer (128k vocab).
+# Smaller vocabularies split the same text into more tokens.
+TOKENIZER_FACTORS = {
+    "llama-3": 1.0,
+    "llama3": 1.0,
+    "mixtral": 1.15,
+    "gemma": 0.95,
+}
+
+SYSTEM_PROMPT = "You are a helpful legal document analyst."
+
+ANALYSIS_INSTRUCTIONS = """You are a legal document expert. Analyze the following legal document and provide a simple, easy-to-understand explanation.
+
+Document text:
+{document}
+
+Please provide:
+1. A simple summary in plain English
+2. Key points and obligations
+3. Any potential risks or concerns
+4. Recommendations for the reader
+5. Mention the risk level(in percentage)
+6. Also mention key dates
+Make the explanation clear and accessible to non-lawyers."""
+
+MAP_INSTRUCTIONS = """Summarize this section of a longer legal document for a later review of the whole document.
+
+Section {index} of {total}:
+{{document}}
+
+List concisely, in plain English:
+- Obligations, payments and amounts
+- Rights, waivers, penalties and other risks to the reader
+- Dates and deadlines
+Do not add commentary beyond what the section says."""
+
+MERGE_INSTRUCTIONS = """Combine these notes on sections {first} to {last} of a longer legal document into one set of notes for a later review of the whole document.
+
+{{document}}
+
+Keep every obligation, payment, amount, right, waiver, penalty, risk, date and deadline the notes mention, in plain English.
+Drop only repetition."""
+
+REDUCE_INSTRUCTIONS = ANALYSIS_INSTRUCTIONS.replace(
+    "Analyze the following legal document",
+    "The following are section-by-section notes on a long legal document. Analyze the document they describe",
+).replace("Document text:", "Section notes:")
+
+TRUNCATION_MARKER = "\n[...]\n"
+
+_WORD_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_SPLIT = re.compile(r"(?<=[.;:!?])(\s+)(?=[A-Z0-9(\"“])")
+_ENUMERATOR = re.compile(r"^\(?[0-9A-Za-z]{1,3}[.)]$")
+_PAGE_NUMBER = re.compile(r"^(page\s+)?[-–\s]*\d+([-–\s]*|\s+of\s+\d+)$", re.IGNORECASE)
+_RULE_LINE = re.compile(r"^[_\-=.\s]{3,}$")
+_SIGNATURE_LINE = re.compile(
+    r"^(by|name|title|signature|signed|its|date|witness)\s*:\s*(_{2,}.*|\[[^\]]*\])?\s*$",
+    re.IGNORECASE,
+)
+
+
+def _tokenizer_factor(model: str) -> float:
+    for prefix, factor in TOKENIZER_FACTORS.items():
+        if model.startswith(prefix):
+            return factor
+    return 1.1  # Unknown tokenizer: over-estimate rather than overflow
+
+
+def estimate_tokens(text: str, model: str = "") -> int:
+    """Estimate the token count of text for the given model without a remote call"""
+    pieces = 0
+    for piece in _WORD_PIECE.findall(text):
+        # BPE vocabularies keep common short words whole and split long ones
+        pieces += 1 if len(piece) <= 6 else math.ceil(len(piece) / 4)
+    return math.ceil(pieces * _tokenizer_factor(model))
+
+
+def context_window(model: str) -> int:
+    for spec in settings.LLM_MODELS:
+        if spec.name == model:
+            return spec.context_window
+    return DEFAULT_CONTEXT_WINDOW
+
+
+def normalize_whitespace(text: str) -> str:
+    """Normalize unicode, line endings and runs of whitespace"""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    # Re-join words hyphenated across line breaks
+    text = re.sub(r"(\w)-\n(\w)", r"\1\2", text)
+    lines = [re.sub(r"[ \t\f\v]+", " ", line).strip() for line in text.split("\n")]
+    text = "\n".join(lines)
+    return re.sub(r"\n{3,}", "\n\n", text).strip()
+
+
+def strip_boilerplate(text: str, min_repeats: int = 3) -> str:
+    """Remove page numbers, repeated headers/footers and signature blocks"""
+    lines = text.split("\n")
+
+    # Short lines that recur many times are running headers or footers, unless
+    # they are always followed by the same line (duplicated body text instead)
+    followers: Dict[str, set] = {}
+    counts: Dict[str, int] = {}
+    for i, line in enumerate(lines):
+        if line and len(line) <= 80:
+            key = line.lower()
+            counts[key] = counts.get(key, 0) + 1
+            following = lines[i + 1].lower() if i + 1 < len(lines) else ""
+            followers.setdefault(key, set()).add(following)
+    running = {key for key, n in counts.items() if n >= min_repeats and len(followers[key]) > 1}
+
+    kept = []
+    for line in lines:
+        if line:
+            if line.lower() in running:
+                continue
+            if _PAGE_NUMBER.match(line) or _RULE_LINE.match(line) or _SIGNATURE_LINE.match(line):
+                continue
+        kept.append(line)
+
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+
+def drop_duplicate_clauses(text: str, min_length: int = 40) -> str:
+    """Drop sentences that repeat an earlier sentence verbatim (ignoring case and punctuation)"""
+    seen = set()
+    paragraphs = []
+    for paragraph in text.split("\n\n"):
+        # Alternating [sentence, separator, sentence, ...] so original breaks survive
+        parts = _SENTENCE_SPLIT.split(paragraph)
+        kept = []
+        marker = ""
+        for i in range(0, len(parts), 2):
+            sentence = parts[i]
+            separator = parts[i + 1] if i + 1 < len(parts) else ""
+            # Section numbers like "2." travel with the clause that follows them
+            if _ENUMERATOR.match(sentence):
+                marker += sentence + separator
+                continue
+            if len(sentence) >= min_length:
+                key = re.sub(r"\W+", " ", sentence.lower()).strip()
+                if key in seen:
+                    marker = ""
+                    continue
+                seen.add(key)
+            kept.append(marker + sentence + separator)
+            marker = ""
+        kept.append(marker)
+        paragraph = "".join(kept).strip()
+        if paragraph:
+            paragraphs.append(paragraph)
+    return "\n\n".join(paragraphs)
+
+
+def compress_text(text: str) -> str:
+    """Apply all lossless-for-analysis reductions to document text"""
+    text = normalize_whitespace(text)
+    text = strip_boilerplate(text)
+    return drop_duplicate_clauses(text)
+
+
+def _take_words(line: str, budget: int, model: str, from_end: bool = False) -> str:
+    words = line.split(" ")
+    if from_end:
+        words.reverse()
+    taken = []
+    used = 0
+    for word in words:
+        cost = estimate_tokens(word, model)
+        if used + cost > budget:
+            break
+        taken.append(word)
+        used += cost
+    if from_end:
+        taken.reverse()
+    return " ".join(taken)
+
+
+def _take_tokens(text: str, budget: int, model: str, from_end: bool = False) -> str:
+    """Take as many lines as fit in budget from the start (or end) of text"""
+    lines = text.split("\n")
+    if from_end:
+        lines.reverse()
+    taken = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line, model) + 1
+        if used + cost > budget:
+            # Split an oversized line at word boundaries rather than dropping it
+            partial = _take_words(line, budget - used - 1, model, from_end)
+            if partial:
+                taken.append(partial)
+            break
+        taken.append(line)
+        used += cost
+    if from_end:
+        taken.reverse()
+    return "\n".join(taken)
+
+
+def fit_to_budget(text: str, budget: int, model: str, tail_ratio: float = 0.0) -> str:
+    """Trim text to at most budget tokens, keeping the head and optionally a tail slice"""
+    if estimate_tokens(text, model) <= budget:
+        return text
+    tail_budget = int(budget * tail_ratio)
+    head = _take_tokens(text, budget - tail_budget, model)
+    if not tail_budget:
+        return head
+    tail = _take_tokens(text[len(head):], tail_budget, model, from_end=True)
+    return head + TRUNCATION_MARKER + tail
+
+
+def chunk_text(text: str, max_tokens: int, model: str) -> List[str]:
+    """Split text into consecutive chunks of at most max_tokens, on line boundaries where possible.
+
+    Lines are accumulated in a single pass; only a line that overflows the
+    current chunk is split into words, once, and its words are then packed the
+    same way, so the cost stays linear in the size of the text.
+    """
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+
+    def flush():
+        nonlocal used
+        chunks.append("\n".join(current))
+        current.clear()
+        used = 0
+
+    for line in text.split("\n"):
+        if not current:
+            # Chunks never start with whitespace or blank lines
+            line = line.lstrip()
+            if not line:
+                continue
+        cost = estimate_tokens(line, model) + 1
+        if used + cost <= max_tokens:
+            current.append(line)
+            used += cost
+            continue
+
+        # Fill the chunk with the line's leading words, then continue the line in the next one
+        words = line.split(" ")
+        costs = [estimate_tokens(word, model) for word in words]
+        start = 0
+        while True:
+            end, spent = start, 0
+            while end < len(words) and spent + costs[end] <= max_tokens - used - 1:
+                spent += costs[end]
+                end += 1
+            if end > start:
+                current.append(" ".join(words[start:end]))
+            elif not current:
+                # A single word longer than the budget; take it whole to make progress
+                current.append(words[start])
+                end = start + 1
+            flush()
+            start = end
+            while start < len(words) and not words[start].strip():
+                start += 1
+            if start == len(words):
+                break
+            # The rest may fit as a line of its own; it cannot when it has more words than tokens allowed
+            if len(words) - start < max_tokens:
+                rest = " ".join(words[start:]).lstrip()
+                cost = estimate_tokens(rest, model) + 1
+                if cost <= max_tokens:
+                    current.append(rest)
+                    used = cost
+                    break
+    if current:
+        flush()
+    return chunks
+
+
+class PromptBuilder:
+    """Builds token-budgeted chat prompts for document analysis"""
+
+    def __init__(self, model: str, token_budget: Optional[int] = None, max_output_tokens: Optional[int] = None):
+        self.model = model
+        self.token_budget = token_budget or settings.PROMPT_TOKEN_BUDGET
+        self.max_output_tokens = max_output_tokens or settings.ANALYSIS_MAX_TOKENS
+
+    def document_budget(self, template: str = ANALYSIS_INSTRUCTIONS) -> int:
+        """Tokens left for the document once instructions and the reply are accounted for"""
+        overhead = estimate_tokens(SYSTEM_PROMPT + template, self.model)
+        window = context_window(self.model) - self.max_output_tokens
+        return max(0, min(self.token_budget, window) - overhead)
+
+    def build(self, text: str, template: str = ANALYSIS_INSTRUCTIONS, compress: bool = True) -> Dict[str, Any]:
+        """Compress text, fit it into the budget and return messages plus stats"""
+        original_tokens = estimate_tokens(text, self.model)
+        compressed = compress_text(text) if compress else text
+        compressed_tokens = estimate_tokens(compressed, self.model)
+
+        document = fit_to_budget(
+            compressed, self.document_budget(template), self.model, settings.PROMPT_TAIL_RATIO
+        )
+        document_tokens = estimate_tokens(document, self.model)
+
+        messages: List[Dict[str, str]] = [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": template.format(document=document)},
+        ]
+
+        return {
+            "messages": messages,
+            "stats": {
+                "model": self.model,
+                "original_tokens": original_tokens,
+                "compressed_tokens": compressed_tokens,
+                "document_tokens": document_tokens,
+                "truncated": document_tokens < compressed_tokens,
+            },
+        }
@@ -1,85 +1,244 @@
+import hashlib
+import itertools
 import os
+import threading
 import time
-from typing import List, Dict, Any
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from groq import Groq
 from app.core.config import settings
+from app.services.clause_index import ClauseIndex
+from app.services.embeddings import EmbeddingService
+from app.services.model_router import model_router
+from app.services.progress import ProgressCallback
+from app.services.vector_index import VectorIndex
+from app.services.prompt_builder import (
+    PromptBuilder, ANALYSIS_INSTRUCTIONS, MAP_INSTRUCTIONS, MERGE_INSTRUCTIONS, REDUCE_INSTRUCTIONS,
+    compress_text, chunk_text, estimate_tokens, normalize_whitespace
+)
 
 class RAGService:
     def __init__(self):
         self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
-        self.documents_store = {}  # Simple in-memory storage
+        # document_id -> fingerprint of the indexed text, least recently used first
+        self.documents_store: "OrderedDict[str, str]" = OrderedDict()
+        self.chunks_store = {}  # document_id -> retrieval chunks
+        self.embeddings = EmbeddingService()
+        self.vector_index = VectorIndex(self.embeddings.dim)
+        self.clause_index = ClauseIndex()
+        self._store_bytes: Dict[str, int] = {}  # document_id -> memory held for its chunks and vectors
+        self._total_bytes = 0
+        self._store_lock = threading.Lock()
         
-    def process_document(self, text: str, document_id: str) -> Dict[str, Any]:
+    def process_document(self, text: str, document_id: str, chunks: Optional[List[str]] = None,
+                         progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
         """Process document text and create simplified analysis"""
         start_time = time.time()
         
-        # Store document text (simple storage)
-        self.documents_store[document_id] = text
+        self.index_document(text, document_id, chunks, progress)
         
         # Generate analysis using GROQ
-        analysis = self._generate_analysis(text)
+        result = self._generate_analysis(text, progress)
         
         processing_time = int(time.time() - start_time)
         
         return {
-            "analysis": analysis,
+            "analysis": result["analysis"],
             "processing_time": processing_time,
-            "chunks_count": 1,  # Simplified
-            "confidence_score": 85
+            "chunks_count": result["chunks_count"],
+            "confidence_score": 85,
+            "prompt_stats": result["prompt_stats"],
+            "model_calls": result["model_calls"],
+            "clause_flags": self.clause_index.get_flags(document_id)
         }
     
-    def _generate_analysis(self, full_text: str) -> str:
-        """Generate simplified analysis using GROQ"""
+    def index_document(self, text: str, document_id: str, chunks: Optional[List[str]] = None,
+                       progress: Optional[ProgressCallback] = None) -> int:
+        """Store document text and its retrieval chunks; returns the number of chunks"""
+        fingerprint = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self._store_lock:
+            if self.documents_store.get(document_id) == fingerprint:
+                self.documents_store.move_to_end(document_id)
+                if progress:
+                    progress("index", 1, 1)
+                return len(self.chunks_store[document_id])
+        
+        chunks = chunks or chunk_text(normalize_whitespace(text), settings.INDEX_CHUNK_TOKENS, "")
+        vectors = self.embeddings.embed(chunks)
+        if progress:
+            progress("embed", len(chunks), len(chunks))
+        self.clause_index.index_document(document_id, chunks, progress)
+        with self._store_lock:
+            self.documents_store[document_id] = fingerprint
+            self.documents_store.move_to_end(document_id)
+            self.chunks_store[document_id] = chunks
+            self.vector_index.add(document_id, vectors)
+            self._total_bytes -= self._store_bytes.get(document_id, 0)
+            self._store_bytes[document_id] = sum(len(chunk) for chunk in chunks) + vectors.nbytes
+            self._total_bytes += self._store_bytes[document_id]
+        self.enforce_memory_cap(keep=document_id)
+        return len(chunks)
+    
+    def remove_document(self, document_id: str):
+        """Forget everything indexed for a document"""
+        with self._store_lock:
+            self._drop(document_id)
+        self.clause_index.remove_document(document_id)
+    
+    def _drop(self, document_id: str):
+        self.documents_store.pop(document_id, None)
+        self.chunks_store.pop(document_id, None)
+        self._total_bytes -= self._store_bytes.pop(document_id, 0)
+        self.vector_index.remove(document_id)
+    
+    def enforce_memory_cap(self, keep: Optional[str] = None) -> int:
+        """Evict least recently used documents until the stores fit RAG_STORE_MAX_BYTES.
+
+        Evicted documents drop out of search until they are indexed again; their
+        clause flags are small and kept. The vector index is compacted once
+        evictions leave INDEX_COMPACT_RATIO of its rows dead. Returns the number
+        of documents evicted.
+        """
+        evicted = 0
+        with self._store_lock:
+            for document_id in list(self.documents_store):
+                if self._total_bytes <= settings.RAG_STORE_MAX_BYTES:
+                    break
+                if document_id != keep:
+                    self._drop(document_id)
+                    evicted += 1
+        # Evicted vectors are only tombstoned; the memory is released once the matrix is rebuilt
+        if evicted and self.vector_index.needs_compaction(settings.INDEX_COMPACT_RATIO):
+            self.vector_index.compact()
+        return evicted
+    
+    def memory_stats(self) -> Dict[str, Any]:
+        with self._store_lock:
+            return {
+                "documents": len(self.documents_store),
+                "bytes": self._total_bytes,
+                "max_bytes": settings.RAG_STORE_MAX_BYTES,
+                "index": self.vector_index.stats(),
+            }
+    
+    def _generate_analysis(self, full_text: str, progress: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """Generate simplified analysis using GROQ, map-reducing documents over the prompt budget"""
+        compressed = compress_text(full_text)
+        calls: List[Dict[str, Any]] = []
+        chunks = [compressed]
+        
+        try:
+            if not compressed.strip():
+                raise ValueError("document has no text")
+            if estimate_tokens(compressed) <= settings.PROMPT_TOKEN_BUDGET:
+                analysis, stats = self._complete("analysis", compressed, ANALYSIS_INSTRUCTIONS,
+                                                 settings.ANALYSIS_MAX_TOKENS, calls, progress)
+            else:
+                # Summarize sections with the fast tier, merge the notes until few enough remain, then analyze them
+                chunks = chunk_text(compressed, settings.MAP_CHUNK_TOKENS, "")
+                summaries = self._map("map", [
+                    (MAP_INSTRUCTIONS.format(index=i, total=len(chunks)), chunk) for i, chunk in enumerate(chunks, 1)
+                ], calls, progress)
+                spans = [(i, i) for i in range(1, len(chunks) + 1)]  # Sections each note covers
+                # As many notes per merge as fit in one map-sized prompt
+                group = max(2, settings.MAP_CHUNK_TOKENS // settings.MAP_MAX_TOKENS)
+                merge_rounds = 0
+                while len(summaries) > max(1, settings.MAX_MAP_CHUNKS):
+                    starts = range(0, len(summaries), group)
+                    spans = [(spans[start][0], spans[min(start + group, len(spans)) - 1][1]) for start in starts]
+                    summaries = self._map("merge", [
+                        (MERGE_INSTRUCTIONS.format(first=first, last=last), "\n\n".join(summaries[start:start + group]))
+                        for start, (first, last) in zip(starts, spans)
+                    ], calls, progress)
+                    merge_rounds += 1
+                notes = "\n\n".join(
+                    f"Section {first}:\n{summary}" if first == last else f"Sections {first}-{last}:\n{summary}"
+                    for (first, last), summary in zip(spans, summaries)
+                )
+                analysis, stats = self._complete("reduce", notes, REDUCE_INSTRUCTIONS,
+                                                 settings.ANALYSIS_MAX_TOKENS, calls, progress)
+                stats["map_sections"] = len(chunks)
+                stats["merge_rounds"] = merge_rounds
+            # The prompt was built from compressed text; report the savings against the original
+            stats["original_tokens"] = estimate_tokens(full_text, stats["model"])
+        except Exception as e:
+            analysis = f"Analysis failed: {str(e)}"
+            stats = {"original_tokens": estimate_tokens(full_text)}
         
-        prompt = f"""
-        You are a legal document expert. Analyze the following legal document and provide a simple, easy-to-understand explanation.
+        return {
+            "analysis": analysis,
+            "prompt_stats": stats,
+            "chunks_count": len(chunks),
+            "model_calls": calls
+        }
+    
+    def _map(self, task: str, items: List[Tuple[str, str]], calls: List[Dict[str, Any]],
+             progress: Optional[ProgressCallback] = None) -> List[str]:
+        """Complete (template, text) items concurrently with the fast tier, keeping their order"""
+        completed = itertools.count(1)
         
-        Document text:
-        {full_text[:4000]}  # Limit text length for API
+        def summarize(item):
+            summary = self._complete(task, item[1], item[0], settings.MAP_MAX_TOKENS, calls)[0]
+            if progress:
+                progress(task, next(completed), len(items))
+            return summary
         
-        Please provide:
-        1. A simple summary in plain English
-        2. Key points and obligations
-        3. Any potential risks or concerns
-        4. Recommendations for the reader
-        5. Mention the risk level(in percentage)
-        6. Also mention key dates
-        Make the explanation clear and accessible to non-lawyers.
-        """
+        if progress:
+            progress(task, 0, len(items))
+        with ThreadPoolExecutor(max_workers=settings.MAP_CONCURRENCY) as pool:
+            return list(pool.map(summarize, items))
+    
+    def _complete(self, task: str, text: str, template: str, max_tokens: int,
+                  calls: List[Dict[str, Any]], progress: Optional[ProgressCallback] = None) -> Tuple[str, Dict[str, Any]]:
+        """Route one completion to a model, call it and record the observed latency"""
+        spec = model_router.choose(task, estimate_tokens(text), max_tokens)
+        prompt = PromptBuilder(spec.name, max_output_tokens=max_tokens).build(text, template, compress=False)
+        if progress:
+            progress(task, 0, 1)
         
+        started = time.time()
         try:
             response = self.groq_client.chat.completions.create(
-                model="llama-3.1-8b-instant",  # Standard available model
-                messages=[
-                    {"role": "system", "content": "You are a helpful legal document analyst."},
-                    {"role": "user", "content": prompt}
-                ],
+                model=spec.name,
+                messages=prompt["messages"],
                 temperature=0.3,
-                max_tokens=1000
+                max_tokens=max_tokens
             )
-            
-            return response.choices[0].message.content
-            
-        except Exception as e:
-            return f"Analysis failed: {str(e)}"
+        except Exception:
+            model_router.record(spec.name, (time.time() - started) * 1000, ok=False)
+            raise
+        latency_ms = (time.time() - started) * 1000
+        model_router.record(spec.name, latency_ms)
+        
+        calls.append({
+            "task": task,
+            "model": spec.name,
+            "input_tokens": prompt["stats"]["document_tokens"],
+            "latency_ms": round(latency_ms)
+        })
+        if progress:
+            progress(task, 1, 1)
+        return response.choices[0].message.content, prompt["stats"]
     
-    def query_documents(self, query: str, document_ids: List[str] = None) -> List[Dict[str, Any]]:
-        """Simple query using stored documents"""
+    def query_documents(self, query: str, document_ids: List[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """Rank stored chunks by cosine similarity to the query"""
         if not self.documents_store:
             return []
         
-        # Simple text search (not vector similarity)
+        query_vector = self.embeddings.embed([query], cache=False)[0]
         results = []
-        for doc_id, text in self.documents_store.items():
-            if document_ids and doc_id not in document_ids:
-                continue
-                
-            # Simple keyword matching
-            if query.lower() in text.lower():
-                results.append({
-                    "content": text[:200] + "...",  # Truncate for display
-                    "metadata": {"document_id": doc_id},
-                    "similarity_score": 0.8  # Placeholder
-                })
+        for doc_id, index, score in self.vector_index.search(query_vector, document_ids, limit):
+            with self._store_lock:
+                chunks = self.chunks_store.get(doc_id)
+                if chunks is None:
+                    continue  # Evicted or removed since the search
+                self.documents_store.move_to_end(doc_id)
+            chunk = chunks[index]
+            results.append({
+                "content": chunk[:200] + "..." if len(chunk) > 200 else chunk,  # Truncate for display
+                "metadata": {"document_id": doc_id, "chunk_index": index},
+                "similarity_score": round(score, 4)
+            })
         
-        return results[:5]  # Limit results
+        return results
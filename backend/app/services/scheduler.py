@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+# Finished jobs kept around so clients can still read their final status
+MAX_FINISHED_JOBS = 1000
+
+# Job priorities; lower values are dispatched first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+class Job:
+    """A unit of analysis work waiting for, or holding, a worker slot"""
+
+    def __init__(self, job_id: int, user_id: int, document_id: int, finish_tag: float, priority: int):
+        self.id = job_id
+        self.user_id = user_id
+        self.document_id = document_id
+        self.finish_tag = finish_tag
+        self.priority = priority
+        self.state = "queued"  # queued, running, completed, failed
+        self.enqueued_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.ready: asyncio.Future = asyncio.get_running_loop().create_future()
+
+
+class FairScheduler:
+    """Weighted fair queuing of analysis jobs across users.
+
+    Each job gets a virtual finish tag of ``max(virtual_time, user's last tag) +
+    cost / weight``; free slots always go to the queued job with the smallest tag,
+    so a user submitting a hundred jobs only delays others by their share.
+    Background jobs only run while no interactive job is waiting, on at most
+    ``background_workers`` slots, and are expected to check ``should_yield``.
+    """
+
+    def __init__(self, workers: int, background_workers: int = 1):
+        self.workers = workers
+        self.background_workers = background_workers
+        self.running = 0
+        self.running_background = 0
+        self.virtual_time = 0.0
+        self._queue: List[Job] = []
+        self._last_tag: Dict[int, float] = {}
+        self._jobs: Dict[Tuple[int, int], Job] = {}
+        self._finished: List[Job] = []
+        self._ids = itertools.count(1)
+
+    def _enqueue(self, user_id: int, document_id: int, cost: float, weight: float, priority: int) -> Job:
+        start = max(self.virtual_time, self._last_tag.get(user_id, 0.0))
+        finish = start + cost / max(weight, 0.01)
+        self._last_tag[user_id] = finish
+        job = Job(next(self._ids), user_id, document_id, finish, priority)
+        self._queue.append(job)
+        self._jobs[(user_id, document_id)] = job
+        return job
+
+    @staticmethod
+    def _order(job: Job):
+        return (job.priority, job.finish_tag, job.id)
+
+    def _dispatch(self):
+        while self.running < self.workers and self._queue:
+            job = min(self._queue, key=self._order)
+            if job.priority == BACKGROUND and self.running_background >= self.background_workers:
+                break
+            self._queue.remove(job)
+            self.virtual_time = max(self.virtual_time, job.finish_tag)
+            self.running += 1
+            if job.priority == BACKGROUND:
+                self.running_background += 1
+            job.state = "running"
+            job.started_at = datetime.now(timezone.utc)
+            job.ready.set_result(None)
+
+    def _finish(self, job: Job, state: str):
+        job.state = state
+        job.finished_at = datetime.now(timezone.utc)
+        self._finished.append(job)
+        if len(self._finished) > MAX_FINISHED_JOBS:
+            stale = self._finished.pop(0)
+            if self._jobs.get((stale.user_id, stale.document_id)) is stale:
+                del self._jobs[(stale.user_id, stale.document_id)]
+        if not self._queue and self.running == 0:
+            # Idle: reset virtual clock so tags don't grow without bound
+            self.virtual_time = 0.0
+            self._last_tag.clear()
+
+    def _release(self, job: Job):
+        self.running -= 1
+        if job.priority == BACKGROUND:
+            self.running_background -= 1
+
+    @asynccontextmanager
+    async def slot(self, user_id: int, document_id: int, cost: float = 1.0, weight: float = 1.0,
+                   priority: int = INTERACTIVE):
+        """Wait for a fair-share worker slot, then hold it for the duration of the block"""
+        job = self._enqueue(user_id, document_id, cost, weight, priority)
+        self._dispatch()
+        try:
+            await job.ready
+        except asyncio.CancelledError:
+            if job in self._queue:
+                self._queue.remove(job)
+            else:
+                self._release(job)
+                self._dispatch()
+            self._finish(job, "failed")
+            raise
+
+        state = "failed"
+        try:
+            yield job
+            state = "completed"
+        finally:
+            self._release(job)
+            self._finish(job, state)
+            self._dispatch()
+
+    def should_yield(self, job: Job) -> bool:
+        """Whether a background job should give its slot back to waiting interactive work"""
+        return (
+            job.priority == BACKGROUND
+            and self.running >= self.workers
+            and any(other.priority == INTERACTIVE for other in self._queue)
+        )
+
+    def queue_position(self, job: Job) -> int:
+        """1-based position among queued jobs, or 0 once the job has a slot"""
+        if job.state != "queued":
+            return 0
+        return 1 + sum(1 for other in self._queue if self._order(other) < self._order(job))
+
+    def get_job(self, user_id: int, document_id: int) -> Optional[Job]:
+        return self._jobs.get((user_id, document_id))
+
+
+analysis_scheduler = FairScheduler(settings.ANALYSIS_WORKERS, settings.SPECULATIVE_WORKERS)
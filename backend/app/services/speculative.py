@@ -0,0 +1,141 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.services.maintenance import delete_document_files
+from app.services.progress import progress_broker
+from app.services.text_store import extract_chunks, save_clause_flags
+from app.services.scheduler import analysis_scheduler, BACKGROUND
+
+STAGES = ("extract", "index", "analyze")
+
+
+def _fingerprint(file_path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class SpeculativeAnalyzer:
+    """Runs extraction, indexing and analysis in the background right after upload.
+
+    Work runs at background priority and hands its worker slot back between
+    stages whenever interactive analyses are waiting. Results are cached per
+    document so that a later ``/analyze`` call can return without waiting.
+    """
+
+    def __init__(self, rag_service):
+        self.rag_service = rag_service
+        self.results: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+    def schedule(self, user_id: int, document_id: int, file_path: str, file_size: int):
+        """Start speculative processing of a freshly uploaded document"""
+        self.cancel(document_id)
+        state = {
+            "file_path": file_path,
+            "fingerprint": _fingerprint(file_path),
+            "progress": progress_broker.reporter(user_id, document_id, speculative=True),
+        }
+        self._store(document_id, state)
+        cost = 1 + file_size / (1024 * 1024)
+        task = asyncio.create_task(self._run(user_id, document_id, state, cost))
+        self.tasks[document_id] = task
+        task.add_done_callback(lambda _: self._forget_task(document_id, task))
+
+    def _forget_task(self, document_id: int, task: asyncio.Task):
+        if self.tasks.get(document_id) is task:
+            del self.tasks[document_id]
+
+    def _store(self, document_id: int, state: Dict[str, Any]):
+        self.results[document_id] = state
+        self.results.move_to_end(document_id)
+        while len(self.results) > settings.SPECULATIVE_CACHE_SIZE:
+            evicted, _ = self.results.popitem(last=False)
+            self.cancel(evicted)
+
+    async def _run(self, user_id: int, document_id: int, state: Dict[str, Any], cost: float):
+        pending = list(STAGES)
+        try:
+            while pending:
+                async with analysis_scheduler.slot(user_id, document_id, cost=cost, priority=BACKGROUND) as job:
+                    while pending:
+                        state["stage"] = pending.pop(0)
+                        await self._run_stage(state["stage"], document_id, state)
+                        if analysis_scheduler.should_yield(job):
+                            break  # Re-queue behind the interactive work
+        except Exception as e:
+            # Speculation is best effort; /analyze will redo the work and report errors
+            state["error"] = str(e)
+
+    async def _run_stage(self, stage: str, document_id: int, state: Dict[str, Any]):
+        if stage == "extract":
+            state["chunks"] = await self._in_thread(
+                document_id, state, extract_chunks, state["file_path"], state["progress"]
+            )
+            state["text"] = "\n".join(state["chunks"])
+        elif stage == "index":
+            await self._in_thread(document_id, state, self._index, document_id, state)
+        elif stage == "analyze":
+            state["rag_result"] = await self._in_thread(
+                document_id, state, self.rag_service.process_document, state["text"], str(document_id),
+                state["chunks"], state["progress"]
+            )
+
+    def _index(self, document_id: int, state: Dict[str, Any]):
+        self.rag_service.index_document(state["text"], str(document_id), state["chunks"], state["progress"])
+        save_clause_flags(state["file_path"], self.rag_service.clause_index.get_flags(str(document_id)))
+
+    async def _in_thread(self, document_id: int, state: Dict[str, Any], work, *args):
+        """Run stage work in the threadpool.
+
+        Cancelling the task does not stop a thread already running, so a stage
+        that outlives the deletion of its document undoes what it stored.
+        """
+        def run():
+            try:
+                return work(*args)
+            finally:
+                if state.get("deleted"):
+                    self.rag_service.remove_document(str(document_id))
+                    delete_document_files(state["file_path"])
+
+        return await run_in_threadpool(run)
+
+    async def take(self, document_id: int) -> Dict[str, Any]:
+        """Claim whatever speculation produced for a document, stopping any unfinished work.
+
+        An analysis call already in flight is awaited rather than thrown away.
+        Returns a dict that may contain ``chunks``, ``text`` and ``rag_result``; it is empty when
+        nothing usable exists or the file changed since the upload.
+        """
+        state = self.results.get(document_id)
+        task = self.tasks.pop(document_id, None)
+        if task and state and state.get("stage") == "analyze":
+            await asyncio.wait([task])
+        elif task:
+            task.cancel()
+        state = self.results.pop(document_id, None)
+        if not state or state.get("error") or state["fingerprint"] != _fingerprint(state["file_path"]):
+            return {}
+        if "rag_result" in state and state["rag_result"]["analysis"].startswith("Analysis failed"):
+            del state["rag_result"]  # Let the interactive call retry the model
+        return {key: state[key] for key in ("chunks", "text", "rag_result") if key in state}
+
+    def discard(self, document_id: int):
+        """Stop speculative work for a deleted document, making any stage still running undo its output"""
+        state = self.results.get(document_id)
+        if state is not None:
+            state["deleted"] = True
+        self.cancel(document_id)
+
+    def cancel(self, document_id: int):
+        """Stop speculative work for a document and drop its cached results"""
+        task = self.tasks.pop(document_id, None)
+        if task:
+            task.cancel()
+        self.results.pop(document_id, None)
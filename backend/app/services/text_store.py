@@ -0,0 +1,271 @@
+import json
+import os
+import struct
+import tempfile
+import zlib
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.services.extractors import EmptyDocumentError, PageText, iter_text_blocks
+from app.services.prompt_builder import chunk_text, normalize_whitespace
+
+try:
+    import zstandard
+except ImportError:  # zlib is always available
+    zstandard = None
+
+# On-disk layout of a text store ("<upload>.ubtx"):
+#   header  : magic, version, codec
+#   frames  : compressed frames, each holding several consecutive chunks
+#   tables  : frame table (offset, compressed size, raw size) then
+#             chunk table (frame, start, length) within the raw frame
+#   footer  : tables offset, frame count, chunk count, crc32 of tables, magic
+# Reading one chunk costs one seek and one frame decompression.
+MAGIC = b"UBTX"
+VERSION = 1
+CODECS = {"zlib": 1, "zstd": 2}
+HEADER = struct.Struct("<4sBB2x")
+FRAME_ENTRY = struct.Struct("<QII")
+CHUNK_ENTRY = struct.Struct("<III")
+FOOTER = struct.Struct("<QIII4s")
+SUFFIX = ".ubtx"
+# Per-page extraction report (method and timing) kept next to paged uploads
+PAGES_SUFFIX = ".pages.json"
+# Known clauses flagged in an upload, so library counts survive restarts and agree across workers
+CLAUSES_SUFFIX = ".clauses.json"
+
+
+def store_path(file_path: str) -> str:
+    """Path of the text store kept next to an upload"""
+    return file_path + SUFFIX
+
+
+def _codec_name(preferred: str) -> str:
+    if preferred == "zstd" and zstandard is None:
+        return "zlib"
+    return preferred
+
+
+def _compress(codec: str, data: bytes, level: int) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level)
+
+
+def _decompress(codec: str, data: bytes, raw_size: int) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=raw_size)
+    return zlib.decompress(data)
+
+
+def write_text_store(path: str, chunks: Iterable[str], codec: Optional[str] = None,
+                     frame_bytes: Optional[int] = None, level: Optional[int] = None) -> int:
+    """Write chunks to a compressed store, returning the number of bytes written"""
+    codec = _codec_name(codec or settings.TEXT_STORE_CODEC)
+    frame_bytes = frame_bytes or settings.TEXT_STORE_FRAME_BYTES
+    level = level if level is not None else (9 if codec == "zstd" else 6)
+
+    frames: List[Tuple[int, int, int]] = []
+    chunk_entries: List[Tuple[int, int, int]] = []
+    # A temporary file per writer: one upload can be extracted by concurrent requests
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or None)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, CODECS[codec]))
+            pending: List[bytes] = []
+            pending_size = 0
+
+            def flush():
+                raw = b"".join(pending)
+                compressed = _compress(codec, raw, level)
+                frames.append((out.tell(), len(compressed), len(raw)))
+                out.write(compressed)
+                pending.clear()
+
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                if pending and pending_size + len(data) > frame_bytes:
+                    flush()
+                    pending_size = 0
+                chunk_entries.append((len(frames), pending_size, len(data)))
+                pending.append(data)
+                pending_size += len(data)
+            if pending:
+                flush()
+
+            tables = b"".join(FRAME_ENTRY.pack(*frame) for frame in frames)
+            tables += b"".join(CHUNK_ENTRY.pack(*entry) for entry in chunk_entries)
+            tables_offset = out.tell()
+            out.write(tables)
+            out.write(FOOTER.pack(tables_offset, len(frames), len(chunk_entries), zlib.crc32(tables), MAGIC))
+            size = out.tell()
+        # Readers never see a half-written store
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    return size
+
+
+class TextStore:
+    """Random-access reader for a compressed text store"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            magic, version, codec_id = HEADER.unpack(self._file.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Not a text store: {path}")
+            self.codec = next(name for name, value in CODECS.items() if value == codec_id)
+            self._file.seek(-FOOTER.size, os.SEEK_END)
+            tables_offset, frame_count, chunk_count, crc, end_magic = FOOTER.unpack(self._file.read(FOOTER.size))
+            if end_magic != MAGIC:
+                raise ValueError(f"Truncated text store: {path}")
+            self._file.seek(tables_offset)
+            tables = self._file.read(frame_count * FRAME_ENTRY.size + chunk_count * CHUNK_ENTRY.size)
+            if zlib.crc32(tables) != crc:
+                raise ValueError(f"Corrupt text store tables: {path}")
+        except Exception:
+            self._file.close()
+            raise
+        split = frame_count * FRAME_ENTRY.size
+        self.frames = list(FRAME_ENTRY.iter_unpack(tables[:split]))
+        self.chunks = list(CHUNK_ENTRY.iter_unpack(tables[split:]))
+        self._cached_frame: Tuple[int, bytes] = (-1, b"")
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def _frame(self, index: int) -> bytes:
+        if self._cached_frame[0] != index:
+            offset, compressed_size, raw_size = self.frames[index]
+            self._file.seek(offset)
+            raw = _decompress(self.codec, self._file.read(compressed_size), raw_size)
+            self._cached_frame = (index, raw)
+        return self._cached_frame[1]
+
+    def chunk(self, index: int) -> str:
+        """Read one chunk, decompressing only the frame that holds it"""
+        frame, start, length = self.chunks[index]
+        return self._frame(frame)[start:start + length].decode("utf-8")
+
+    def text(self) -> str:
+        return "\n".join(self.chunk(i) for i in range(len(self)))
+
+    def stats(self) -> dict:
+        raw = sum(frame[2] for frame in self.frames)
+        stored = os.path.getsize(self.path)
+        return {
+            "codec": self.codec,
+            "chunks": len(self.chunks),
+            "frames": len(self.frames),
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "ratio": round(raw / stored, 2) if stored else 0.0,
+        }
+
+
+def save_document_chunks(file_path: str, chunks: List[str]) -> str:
+    """Persist an upload's extracted chunks next to it"""
+    path = store_path(file_path)
+    write_text_store(path, chunks)
+    return path
+
+
+def load_document_chunks(file_path: str) -> Optional[List[str]]:
+    """Chunks stored for an upload, or None when missing or older than the upload"""
+    path = store_path(file_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(file_path):
+            return None
+        with TextStore(path) as store:
+            return [store.chunk(i) for i in range(len(store))]
+    except Exception:
+        # A missing or damaged store is only a cache miss
+        return None
+
+
+def load_document_chunk(file_path: str, index: int) -> Optional[Tuple[int, Optional[str]]]:
+    """Chunk count and one stored chunk (None when out of range), or None when the store
+    is missing, damaged or older than the upload"""
+    path = store_path(file_path)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(file_path):
+            return None
+        with TextStore(path) as store:
+            return len(store), store.chunk(index) if 0 <= index < len(store) else None
+    except Exception:
+        return None
+
+
+def load_page_report(file_path: str) -> Optional[List[Dict[str, Any]]]:
+    """How each page of an upload was extracted, when it was paged"""
+    try:
+        with open(file_path + PAGES_SUFFIX) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def save_clause_flags(file_path: str, flags: List[Dict[str, Any]]):
+    """Persist the clause flags found in an upload next to it"""
+    path = file_path + CLAUSES_SUFFIX
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp",
+                                    dir=os.path.dirname(path) or None)
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(flags, file)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        # This worker still has the flags in memory; others will recompute them
+
+
+def load_clause_flags(file_path: str) -> Optional[List[Dict[str, Any]]]:
+    """Clause flags persisted for an upload, or None when they were never saved"""
+    try:
+        with open(file_path + CLAUSES_SUFFIX) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def extract_chunks(file_path: str, progress: Optional[Callable[[str, int, int], None]] = None) -> List[str]:
+    """Retrieval chunks of an upload, from its text store or by extracting and storing them"""
+    chunks = load_document_chunks(file_path)
+    # An empty store predates the empty-document check; extract again, OCR may work now
+    if chunks is not None and any(chunk.strip() for chunk in chunks):
+        if progress:
+            progress("extract", 1, 1)
+        return chunks
+    
+    blocks = list(iter_text_blocks(file_path, progress))
+    text = normalize_whitespace("\n".join(block for block in blocks if block))
+    if not text.strip():
+        raise EmptyDocumentError("No text could be extracted; the document may be a scan and OCR is unavailable")
+    chunks = chunk_text(text, settings.INDEX_CHUNK_TOKENS, "")
+    try:
+        save_document_chunks(file_path, chunks)
+        pages = [block.report() for block in blocks if isinstance(block, PageText)]
+        if pages:
+            with open(file_path + PAGES_SUFFIX, "w") as file:
+                json.dump(pages, file)
+    except OSError:
+        pass  # Serving the text matters more than caching it
+    return chunks
@@ -0,0 +1,114 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+
+class VectorIndex:
+    """Chunk vectors of every indexed document in one matrix, searched with a single product.
+
+    New documents are appended to a pending list and merged on the next search.
+    Removing a document only tombstones its rows; ``compact`` rebuilds the
+    matrix without them once enough have accumulated.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._matrix = np.zeros((0, dim), dtype=np.float32)
+        self._owners = np.zeros(0, dtype=np.int64)  # Document key of each row
+        self._chunk_ids = np.zeros(0, dtype=np.int64)  # Chunk index of each row within its document
+        self._live = np.zeros(0, dtype=bool)
+        self._pending: List[Tuple[int, np.ndarray]] = []
+        self._keys: Dict[str, int] = {}  # document_id -> key, for live documents only
+        self._ids: Dict[int, str] = {}
+        self._next_key = 0
+        self._tombstones = 0
+        self.last_rebuild = time.time()
+        self._lock = threading.Lock()
+
+    def __contains__(self, document_id: str) -> bool:
+        return document_id in self._keys
+
+    def add(self, document_id: str, vectors: np.ndarray):
+        """Index a document's chunk vectors, replacing any previous ones"""
+        with self._lock:
+            self._remove(document_id)
+            key = self._next_key
+            self._next_key += 1
+            self._keys[document_id] = key
+            self._ids[key] = document_id
+            self._pending.append((key, vectors.astype(np.float32, copy=False)))
+
+    def remove(self, document_id: str):
+        with self._lock:
+            self._remove(document_id)
+
+    def _remove(self, document_id: str):
+        key = self._keys.pop(document_id, None)
+        if key is None:
+            return
+        del self._ids[key]
+        before = len(self._pending)
+        self._pending = [(k, v) for k, v in self._pending if k != key]
+        if len(self._pending) == before:
+            rows = self._live & (self._owners == key)
+            self._tombstones += int(rows.sum())
+            self._live &= ~rows
+
+    def _merge_pending(self):
+        if not self._pending:
+            return
+        self._matrix = np.vstack([self._matrix] + [vectors for _, vectors in self._pending])
+        self._owners = np.concatenate([self._owners] + [np.full(len(v), k) for k, v in self._pending])
+        self._chunk_ids = np.concatenate([self._chunk_ids] + [np.arange(len(v)) for _, v in self._pending])
+        self._live = np.concatenate([self._live, np.ones(sum(len(v) for _, v in self._pending), dtype=bool)])
+        self._pending = []
+
+    def search(self, query_vector: np.ndarray, document_ids: Optional[List[str]] = None,
+               limit: int = 5) -> List[Tuple[str, int, float]]:
+        """Best (document_id, chunk_index, cosine) matches; vectors are unit length"""
+        with self._lock:
+            self._merge_pending()
+            if not len(self._matrix):
+                return []
+            mask = self._live
+            if document_ids:
+                keys = [self._keys[doc_id] for doc_id in document_ids if doc_id in self._keys]
+                mask = mask & np.isin(self._owners, keys)
+            candidates = np.flatnonzero(mask)
+            if not len(candidates):
+                return []
+            scores = self._matrix[candidates] @ query_vector
+            top = np.argsort(-scores)[:limit]
+            return [
+                (self._ids[int(self._owners[candidates[i]])], int(self._chunk_ids[candidates[i]]), float(scores[i]))
+                for i in top if scores[i] > 0
+            ]
+
+    def needs_compaction(self, ratio: float) -> bool:
+        rows = len(self._live)
+        return rows > 0 and self._tombstones / rows >= ratio
+
+    def compact(self) -> int:
+        """Rebuild the matrix from live rows only; returns the number of rows dropped"""
+        with self._lock:
+            self._merge_pending()
+            dropped = self._tombstones
+            # Boolean indexing copies, so tombstoned rows stop holding memory
+            self._matrix = np.ascontiguousarray(self._matrix[self._live])
+            self._owners = self._owners[self._live]
+            self._chunk_ids = self._chunk_ids[self._live]
+            self._live = np.ones(len(self._matrix), dtype=bool)
+            self._tombstones = 0
+            self.last_rebuild = time.time()
+            return dropped
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = len(self._live) + sum(len(v) for _, v in self._pending)
+            return {
+                "documents": len(self._keys),
+                "rows": rows,
+                "tombstones": self._tombstones,
+                "bytes": int(self._matrix.nbytes) + sum(v.nbytes for _, v in self._pending),
+            }
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark chunk embedding: one chunk at a time vs micro-batched, cold vs warm cache
+"""
+
+import random
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.append(str(Path(__file__).parent))
+
+from app.services.embeddings import EmbeddingService
+from app.services.prompt_builder import chunk_text, normalize_whitespace
+
+
+def sample_documents(count: int):
+    """Contract-like documents from the test loan agreement; numbers vary, boilerplate repeats"""
+    source = (Path(__file__).parent / "test_rag.py").read_text()
+    agreement = source.split('test_document = """')[1].split('"""')[0]
+    rng = random.Random(7)
+    documents = []
+    for _ in range(count):
+        parts = []
+        for section in range(20):
+            parts.append(f"Schedule {section + 1}")
+            # Half the sections keep the standard wording, as boilerplate does across contracts
+            if section % 2:
+                parts.append(re.sub(r"\d+", lambda m: str(rng.randint(1, 99999)), agreement))
+            else:
+                parts.append(agreement)
+        documents.append(chunk_text(normalize_whitespace("\n".join(parts)), 400, ""))
+    return documents
+
+
+def bench(documents, batching: bool, cache_size: int, concurrency: int):
+    service = EmbeddingService(batching=batching, cache_size=cache_size)
+    started = time.perf_counter()
+    # Documents are indexed concurrently, as they are by parallel uploads
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(service.embed, documents))
+    elapsed = time.perf_counter() - started
+    stats = service.stats()
+    return {
+        "wall_cps": sum(len(chunks) for chunks in documents) / elapsed,
+        "embed_cps": stats["chunks_per_second"],
+        "hit_rate": stats["cache_hit_rate"],
+        "batches": stats["batches"],
+        "avg_batch": stats["avg_batch_size"],
+    }
+
+
+def main():
+    documents = sample_documents(64)
+    total = sum(len(chunks) for chunks in documents)
+    print(f"📄 {len(documents)} documents, {total} chunks")
+    print("=" * 78)
+    print(f"{'batching':<10}{'cache':>7}{'threads':>9}{'chunks/s':>11}{'embed/s':>10}"
+          f"{'hit rate':>10}{'batches':>9}{'avg batch':>11}")
+
+    for batching in (False, True):
+        for cache_size in (0, 10000):
+            for concurrency in (1, 8):
+                result = bench(documents, batching, cache_size, concurrency)
+                print(f"{'on' if batching else 'off':<10}{'on' if cache_size else 'off':>7}{concurrency:>9}"
+                      f"{result['wall_cps']:>11.0f}{result['embed_cps']:>10.0f}{result['hit_rate']:>10.2f}"
+                      f"{result['batches']:>9}{result['avg_batch']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
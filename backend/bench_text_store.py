@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark the compressed text store: compression ratio and random-access latency
+"""
+
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the app directory to Python path
+sys.path.append(str(Path(__file__).parent))
+
+from app.services.prompt_builder import chunk_text, normalize_whitespace
+from app.services.text_store import TextStore, write_text_store, zstandard
+
+
+def sample_text() -> str:
+    """A long contract-like text built from the test loan agreement with varied numbers"""
+    source = (Path(__file__).parent / "test_rag.py").read_text()
+    agreement = source.split('test_document = """')[1].split('"""')[0]
+    rng = random.Random(7)
+    parts = []
+    for section in range(200):
+        parts.append(f"Schedule {section + 1}")
+        parts.append(re.sub(r"\d+", lambda m: str(rng.randint(1, 99999)), agreement))
+    return normalize_whitespace("\n".join(parts))
+
+
+def bench(chunks, codec: str, frame_bytes: int, reads: int = 2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "doc.ubtx")
+        started = time.perf_counter()
+        write_text_store(path, chunks, codec=codec, frame_bytes=frame_bytes)
+        write_ms = (time.perf_counter() - started) * 1000
+
+        rng = random.Random(1)
+        timings = []
+        with TextStore(path) as store:
+            stats = store.stats()
+            for _ in range(reads):
+                index = rng.randrange(len(store))
+                # Open a fresh reader each time so the frame cache does not hide the cost
+                started = time.perf_counter()
+                with TextStore(path) as reader:
+                    reader.chunk(index)
+                timings.append((time.perf_counter() - started) * 1_000_000)
+
+            started = time.perf_counter()
+            store.text()
+            full_ms = (time.perf_counter() - started) * 1000
+
+    timings.sort()
+    return {
+        "ratio": stats["ratio"],
+        "stored_kb": stats["stored_bytes"] / 1024,
+        "write_ms": write_ms,
+        "p50_us": statistics.median(timings),
+        "p95_us": timings[int(len(timings) * 0.95)],
+        "full_ms": full_ms,
+    }
+
+
+def main():
+    text = sample_text()
+    chunks = chunk_text(text, 400, "")
+    raw_kb = len(text.encode("utf-8")) / 1024
+    print(f"📄 {len(chunks)} chunks, {raw_kb:.0f} KB of extracted text")
+    print("=" * 78)
+    print(f"{'codec':<6}{'frame':>8}{'ratio':>8}{'stored KB':>11}{'write ms':>10}"
+          f"{'chunk p50 µs':>14}{'p95 µs':>9}{'full ms':>9}")
+
+    codecs = ["zlib"] + (["zstd"] if zstandard is not None else [])
+    for codec in codecs:
+        for frame_bytes in (1, 4096, 16384, 65536, 1 << 30):
+            result = bench(chunks, codec, frame_bytes)
+            label = "chunk" if frame_bytes == 1 else ("whole" if frame_bytes == 1 << 30 else str(frame_bytes))
+            print(f"{codec:<6}{label:>8}{result['ratio']:>8.2f}{result['stored_kb']:>11.1f}"
+                  f"{result['write_ms']:>10.1f}{result['p50_us']:>14.0f}{result['p95_us']:>9.0f}"
+                  f"{result['full_ms']:>9.1f}")
+
+    if zstandard is None:
+        print("\nℹ️  zstandard not installed; only zlib was measured")
+
+
+if __name__ == "__main__":
+    main()
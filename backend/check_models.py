@@ -5,6 +5,7 @@ Check available GROQ models
 
 import os
 import sys
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -14,9 +15,10 @@ env_path = project_root / ".env"
 load_dotenv(env_path)
 
 from groq import Groq
+from app.core.config import settings
 
 def check_models():
-    """Check available GROQ models"""
+    """Check the configured model registry against GROQ and measure latencies"""
     
     groq_api_key = os.getenv("GROQ_API_KEY")
     if not groq_api_key:
@@ -25,49 +27,36 @@ def check_models():
     
     try:
         client = Groq(api_key=groq_api_key)
+        available = {model.id for model in client.models.list().data}
         
-        # Try some common model names
-        common_models = [
-            "llama3.1-8b",
-            "llama3.1-70b", 
-            "llama3.1-405b",
-            "mixtral-8x7b-32768",
-            "gemma-7b-it",
-            "llama3.1-8b-8192",
-            "llama3.1-70b-8192"
-        ]
-        
-        print("🔍 Testing available GROQ models...")
+        print("🔍 Checking registered GROQ models...")
         print("=" * 50)
         
-        working_models = []
-        
-        for model in common_models:
+        for spec in settings.LLM_MODELS:
+            if spec.name not in available:
+                print(f"❌ {spec.name} - Not available (remove it from LLM_MODELS)")
+                continue
+            
+            # Time a small, analysis-shaped call to refresh latency_ms
+            started = time.time()
             try:
-                # Try a simple completion to test if model works
-                response = client.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "user", "content": "Hello"}],
-                    max_tokens=10
+                client.chat.completions.create(
+                    model=spec.name,
+                    messages=[{"role": "user", "content": "Summarize: The tenant pays rent monthly."}],
+                    max_tokens=50
                 )
-                print(f"✅ {model} - WORKING")
-                working_models.append(model)
             except Exception as e:
-                error_msg = str(e)
-                if "model_not_found" in error_msg:
-                    print(f"❌ {model} - Not found")
-                elif "decommissioned" in error_msg:
-                    print(f"⚠️  {model} - Decommissioned")
-                else:
-                    print(f"❌ {model} - Error: {error_msg[:100]}...")
+                print(f"⚠️  {spec.name} - Error: {str(e)[:100]}...")
+                continue
+            latency_ms = int((time.time() - started) * 1000)
+            print(f"✅ {spec.name} ({spec.tier}) - {latency_ms} ms (registry: {spec.latency_ms} ms)")
         
-        print("\n" + "=" * 50)
-        if working_models:
-            print(f"🎉 Found {len(working_models)} working models:")
-            for model in working_models:
+        unregistered = sorted(available - {spec.name for spec in settings.LLM_MODELS})
+        if unregistered:
+            print("\n" + "=" * 50)
+            print("ℹ️  Available but not registered:")
+            for model in unregistered:
                 print(f"   • {model}")
-        else:
-            print("❌ No working models found")
             
     except Exception as e:
         print(f"❌ Error connecting to GROQ: {e}")
@@ -6,6 +6,7 @@ from dotenv import load_dotenv
 
 from app.core.config import settings
 from app.api.v1.api import api_router
+from app.api.v1.endpoints.documents import maintenance
 from app.core.database import engine
 from app.models import Base
 
@@ -38,6 +39,14 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def start_maintenance():
+    maintenance.start()
+
+@app.on_event("shutdown")
+async def stop_maintenance():
+    await maintenance.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to UnBind API", "version": "1.0.0"}